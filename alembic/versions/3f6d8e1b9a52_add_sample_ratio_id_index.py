@@ -0,0 +1,28 @@
+"""Replace the experiment sample_ratio index with a (sample_ratio, id) index
+
+Revision ID: 3f6d8e1b9a52
+Revises: e8b2f4a61c37
+Create Date: 2026-10-17 18:12:50.274316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f6d8e1b9a52'
+down_revision: Union[str, None] = 'e8b2f4a61c37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_experiment_sample_ratio_id', 'experiment', ['sample_ratio', 'id'], unique=False)
+    op.drop_index('ix_experiment_sample_ratio', table_name='experiment')
+
+
+def downgrade() -> None:
+    op.create_index('ix_experiment_sample_ratio', 'experiment', ['sample_ratio'], unique=False)
+    op.drop_index('ix_experiment_sample_ratio_id', table_name='experiment')
@@ -0,0 +1,50 @@
+"""Add team_closure table
+
+Revision ID: 5f2c9a7e1d34
+Revises: 085b43b47fbd
+Create Date: 2026-10-17 09:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f2c9a7e1d34'
+down_revision: Union[str, None] = '085b43b47fbd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'team_closure',
+        sa.Column('ancestor_id', sa.Integer(), nullable=False),
+        sa.Column('descendant_id', sa.Integer(), nullable=False),
+        sa.Column('depth', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['ancestor_id'], ['team.id'], ),
+        sa.ForeignKeyConstraint(['descendant_id'], ['team.id'], ),
+        sa.PrimaryKeyConstraint('ancestor_id', 'descendant_id')
+    )
+    op.create_index(op.f('ix_team_closure_descendant_id'), 'team_closure', ['descendant_id'], unique=False)
+
+    # Backfill the closure of the existing hierarchy
+    op.execute(
+        """
+        INSERT INTO team_closure (ancestor_id, descendant_id, depth)
+        WITH RECURSIVE paths (ancestor_id, descendant_id, depth) AS (
+            SELECT id, id, 0 FROM team
+            UNION ALL
+            SELECT paths.ancestor_id, team.id, paths.depth + 1
+            FROM paths JOIN team ON team.parent_id = paths.descendant_id
+        )
+        SELECT ancestor_id, descendant_id, depth FROM paths
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_team_closure_descendant_id'), table_name='team_closure')
+    op.drop_table('team_closure')
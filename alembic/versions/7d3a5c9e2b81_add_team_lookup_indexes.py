@@ -0,0 +1,28 @@
+"""Add indexes on experiment_team.team_id and team.parent_id
+
+Revision ID: 7d3a5c9e2b81
+Revises: c41f7a2e9d15
+Create Date: 2026-10-17 15:04:12.540871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d3a5c9e2b81'
+down_revision: Union[str, None] = 'c41f7a2e9d15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(op.f('ix_experiment_team_team_id'), 'experiment_team', ['team_id'], unique=False)
+    op.create_index(op.f('ix_team_parent_id'), 'team', ['parent_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_team_parent_id'), table_name='team')
+    op.drop_index(op.f('ix_experiment_team_team_id'), table_name='experiment_team')
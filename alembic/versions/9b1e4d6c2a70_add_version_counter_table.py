@@ -0,0 +1,32 @@
+"""Add version_counter table
+
+Revision ID: 9b1e4d6c2a70
+Revises: 5f2c9a7e1d34
+Create Date: 2026-10-17 10:03:27.904512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b1e4d6c2a70'
+down_revision: Union[str, None] = '5f2c9a7e1d34'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    version_counter = op.create_table(
+        'version_counter',
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('value', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+    op.bulk_insert(version_counter, [{'name': 'team_tree', 'value': 0}])
+
+
+def downgrade() -> None:
+    op.drop_table('version_counter')
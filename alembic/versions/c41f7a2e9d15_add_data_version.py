@@ -0,0 +1,31 @@
+"""Add data version counter
+
+Revision ID: c41f7a2e9d15
+Revises: 9b1e4d6c2a70
+Create Date: 2026-10-17 13:21:45.118203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41f7a2e9d15'
+down_revision: Union[str, None] = '9b1e4d6c2a70'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    version_counter = sa.table(
+        'version_counter',
+        sa.column('name', sa.String()),
+        sa.column('value', sa.Integer()),
+    )
+    op.bulk_insert(version_counter, [{'name': 'data', 'value': 0}])
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM version_counter WHERE name = 'data'")
@@ -0,0 +1,32 @@
+"""Add full-text search index on experiment descriptions
+
+Revision ID: e8b2f4a61c37
+Revises: 7d3a5c9e2b81
+Create Date: 2026-10-17 16:37:28.902614
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8b2f4a61c37'
+down_revision: Union[str, None] = '7d3a5c9e2b81'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_experiment_description_search',
+        'experiment',
+        [sa.text("to_tsvector('simple'::regconfig, description)")],
+        unique=False,
+        postgresql_using='gin',
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_experiment_description_search', table_name='experiment')
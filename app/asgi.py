@@ -0,0 +1,12 @@
+"""
+ASGI entry point serving either the sync or the async application, depending on ASYNC_MODE.
+"""
+
+from .database import ASYNC_MODE
+
+if ASYNC_MODE:
+    from .async_main import app
+else:
+    from .main import app
+
+__all__ = ["app"]
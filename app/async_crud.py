@@ -0,0 +1,314 @@
+"""
+Async versions of the functions in `crud`.
+
+Each function runs its `crud` counterpart on an `AsyncSession` through `AsyncSession.run_sync`,
+so the business rules stay in one place while the I/O goes through the async driver (asyncpg,
+aiosqlite). Results are converted to schemas before leaving `run_sync`, as lazy loads are only
+possible inside it.
+"""
+
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import crud, database, schemas
+from .fieldsets import (
+    EXPERIMENT_FIELDS,
+    EXPERIMENT_RELATIONSHIPS,
+    TEAM_FIELDS,
+    TEAM_RELATIONSHIPS,
+)
+
+
+async def get_data_version(db: AsyncSession) -> int:
+    return await db.run_sync(crud.get_data_version)
+
+
+async def get_experiment(db: AsyncSession, experiment_id: int) -> schemas.Experiment | None:
+    return await db.run_sync(
+        lambda session: schemas.to_schema(
+            schemas.Experiment, crud.get_experiment(session, experiment_id=experiment_id)
+        )
+    )
+
+
+async def get_experiments(
+    db: AsyncSession,
+    team: str | None = None,
+    include_descendants: bool = False,
+    limit: int | None = None,
+    after_id: int | None = None,
+    min_sample_ratio: float | None = None,
+    max_sample_ratio: float | None = None,
+    sort: schemas.ExperimentSort = "id",
+    after_sample_ratio: float | None = None,
+) -> list[schemas.Experiment]:
+    return await db.run_sync(
+        lambda session: schemas.to_schema(
+            schemas.Experiment,
+            crud.get_experiments(
+                session,
+                team=team,
+                include_descendants=include_descendants,
+                limit=limit,
+                after_id=after_id,
+                min_sample_ratio=min_sample_ratio,
+                max_sample_ratio=max_sample_ratio,
+                sort=sort,
+                after_sample_ratio=after_sample_ratio,
+            ),
+        )
+    )
+
+
+async def get_experiment_rows(
+    db: AsyncSession,
+    team: str | None = None,
+    include_descendants: bool = False,
+    limit: int | None = None,
+    after_id: int | None = None,
+    fields: tuple[str, ...] = EXPERIMENT_FIELDS,
+    expand: tuple[str, ...] = EXPERIMENT_RELATIONSHIPS,
+    min_sample_ratio: float | None = None,
+    max_sample_ratio: float | None = None,
+    sort: schemas.ExperimentSort = "id",
+    after_sample_ratio: float | None = None,
+) -> list[dict]:
+    return await db.run_sync(
+        crud.get_experiment_rows,
+        team=team,
+        include_descendants=include_descendants,
+        limit=limit,
+        after_id=after_id,
+        fields=fields,
+        expand=expand,
+        min_sample_ratio=min_sample_ratio,
+        max_sample_ratio=max_sample_ratio,
+        sort=sort,
+        after_sample_ratio=after_sample_ratio,
+    )
+
+
+async def get_versioned_experiment_rows(
+    db: AsyncSession, is_current: Callable[[int], bool], **kwargs
+) -> tuple[int, list[dict] | None]:
+    return await db.run_sync(crud.get_versioned_experiment_rows, is_current, **kwargs)
+
+
+async def get_experiment_row(
+    db: AsyncSession,
+    experiment_id: int,
+    fields: tuple[str, ...] = EXPERIMENT_FIELDS,
+    expand: tuple[str, ...] = EXPERIMENT_RELATIONSHIPS,
+) -> dict | None:
+    return await db.run_sync(
+        crud.get_experiment_row, experiment_id=experiment_id, fields=fields, expand=expand
+    )
+
+
+async def export_experiments(
+    db: AsyncSession,
+    team: str | None = None,
+    include_descendants: bool = False,
+    batch_size: int = 1000,
+) -> AsyncIterator[dict]:
+    rows = await db.stream(
+        crud.export_experiments_statement(team, include_descendants).execution_options(
+            yield_per=batch_size
+        )
+    )
+    experiment = None
+    async for row in rows:
+        experiment, completed = crud.group_exported_experiments(experiment, row)
+        if completed is not None:
+            yield completed
+    if experiment is not None:
+        yield experiment
+
+
+@asynccontextmanager
+async def open_read_session(primary: bool = False) -> AsyncIterator[AsyncSession]:
+    async with database.open_async_read_session(primary) as db:
+        yield db
+
+
+async def search_experiment_rows(
+    db: AsyncSession,
+    query: str,
+    team: str | None = None,
+    include_descendants: bool = False,
+    limit: int | None = None,
+    after: tuple[float, int] | None = None,
+    fields: tuple[str, ...] = EXPERIMENT_FIELDS,
+    expand: tuple[str, ...] = EXPERIMENT_RELATIONSHIPS,
+) -> list[dict]:
+    return await db.run_sync(
+        crud.search_experiment_rows,
+        query,
+        team=team,
+        include_descendants=include_descendants,
+        limit=limit,
+        after=after,
+        fields=fields,
+        expand=expand,
+    )
+
+
+async def create_experiment(
+    db: AsyncSession, experiment: schemas.ExperimentCreate
+) -> schemas.Experiment:
+    return await db.run_sync(
+        lambda session: schemas.to_schema(
+            schemas.Experiment, crud.create_experiment(session, experiment=experiment)
+        )
+    )
+
+
+async def create_experiments(
+    db: AsyncSession, experiments: list[schemas.ExperimentCreate], atomic: bool = True
+) -> list[schemas.ExperimentBulkResult]:
+    return await db.run_sync(
+        lambda session: schemas.to_bulk_results(
+            crud.create_experiments(session, experiments=experiments, atomic=atomic)
+        )
+    )
+
+
+async def update_experiment(
+    db: AsyncSession, experiment: schemas.ExperimentUpdate, experiment_id: int
+) -> schemas.Experiment:
+    return await db.run_sync(
+        lambda session: schemas.to_schema(
+            schemas.Experiment,
+            crud.update_experiment(session, experiment=experiment, experiment_id=experiment_id),
+        )
+    )
+
+
+async def reassign_experiment_teams(
+    db: AsyncSession, experiment: schemas.ExperimentReassignTeams, experiment_id: int
+) -> schemas.Experiment:
+    return await db.run_sync(
+        lambda session: schemas.to_schema(
+            schemas.Experiment,
+            crud.reassign_experiment_teams(
+                session, experiment=experiment, experiment_id=experiment_id
+            ),
+        )
+    )
+
+
+async def delete_experiment(db: AsyncSession, experiment_id: int):
+    return await db.run_sync(crud.delete_experiment, experiment_id=experiment_id)
+
+
+async def get_teams(
+    db: AsyncSession, limit: int | None = None, after_id: int | None = None
+) -> list[schemas.Team]:
+    return await db.run_sync(
+        lambda session: schemas.to_schema(
+            schemas.Team, crud.get_teams(session, limit=limit, after_id=after_id)
+        )
+    )
+
+
+async def get_team_rows(
+    db: AsyncSession,
+    limit: int | None = None,
+    after_id: int | None = None,
+    fields: tuple[str, ...] = TEAM_FIELDS,
+    expand: tuple[str, ...] = TEAM_RELATIONSHIPS,
+) -> list[dict]:
+    return await db.run_sync(
+        crud.get_team_rows, limit=limit, after_id=after_id, fields=fields, expand=expand
+    )
+
+
+async def get_versioned_team_rows(
+    db: AsyncSession, is_current: Callable[[int], bool], **kwargs
+) -> tuple[int, list[dict] | None]:
+    return await db.run_sync(crud.get_versioned_team_rows, is_current, **kwargs)
+
+
+async def get_team_row(
+    db: AsyncSession,
+    team_name: str,
+    fields: tuple[str, ...] = TEAM_FIELDS,
+    expand: tuple[str, ...] = TEAM_RELATIONSHIPS,
+) -> dict | None:
+    return await db.run_sync(crud.get_team_row, team_name=team_name, fields=fields, expand=expand)
+
+
+async def get_team_tree(
+    db: AsyncSession,
+    team_name: str,
+    max_depth: int | None = None,
+    with_experiment_counts: bool = False,
+) -> dict | None:
+    return await db.run_sync(
+        crud.get_team_tree,
+        team_name=team_name,
+        max_depth=max_depth,
+        with_experiment_counts=with_experiment_counts,
+    )
+
+
+async def get_team_ancestors(db: AsyncSession, team_name: str) -> list[dict] | None:
+    return await db.run_sync(crud.get_team_ancestors, team_name=team_name)
+
+
+async def check_ancestry(
+    db: AsyncSession, pairs: list[schemas.AncestryCheck]
+) -> list[bool | None]:
+    return await db.run_sync(crud.check_ancestry, pairs=pairs)
+
+
+async def get_team_stats(
+    db: AsyncSession,
+    team: str | None = None,
+    limit: int | None = None,
+    after_id: int | None = None,
+) -> list[dict]:
+    return await db.run_sync(crud.get_team_stats, team=team, limit=limit, after_id=after_id)
+
+
+async def get_team_by_id(db: AsyncSession, team_id: int) -> schemas.Team | None:
+    return await db.run_sync(
+        lambda session: schemas.to_schema(schemas.Team, crud.get_team_by_id(session, team_id=team_id))
+    )
+
+
+async def get_team_by_name(db: AsyncSession, team_name: str) -> schemas.Team | None:
+    return await db.run_sync(
+        lambda session: schemas.to_schema(
+            schemas.Team, crud.get_team_by_name(session, team_name=team_name)
+        )
+    )
+
+
+async def create_team(db: AsyncSession, team: schemas.TeamCreate) -> schemas.Team:
+    return await db.run_sync(
+        lambda session: schemas.to_schema(schemas.Team, crud.create_team(session, team=team))
+    )
+
+
+async def import_teams(
+    db: AsyncSession, teams: list[schemas.TeamImport]
+) -> list[schemas.TeamImported]:
+    created = await db.run_sync(crud.import_teams, teams=teams)
+    return schemas.to_imported_teams(created)
+
+
+async def update_team(
+    db: AsyncSession, team: schemas.TeamUpdate, team_name: str
+) -> schemas.Team:
+    return await db.run_sync(
+        lambda session: schemas.to_schema(
+            schemas.Team, crud.update_team(session, team=team, team_name=team_name)
+        )
+    )
+
+
+async def delete_team(db: AsyncSession, team_name: str):
+    return await db.run_sync(crud.delete_team, team_name=team_name)
@@ -0,0 +1,26 @@
+"""
+Async variant of the application in `main`, serving the same API (see `routes`) on `async_crud`
+backed by an async engine. Selected by setting ASYNC_MODE (see `asgi`).
+"""
+
+from fastapi import FastAPI
+
+from . import async_crud, database
+from .database import get_async_db, get_async_read_db
+from .instrumentation import MetricsMiddleware
+from .pooling import get_pool_stats
+from .replication import ReadYourWritesMiddleware
+from .routes import create_router
+
+app = FastAPI()
+app.add_middleware(ReadYourWritesMiddleware)
+app.add_middleware(MetricsMiddleware)
+app.include_router(create_router(async_crud, get_db=get_async_db, get_read_db=get_async_read_db))
+
+
+@app.get("/pool/stats", include_in_schema=False)
+async def read_pool_stats():
+    """
+    Get live statistics of the database connection pool.
+    """
+    return get_pool_stats(database.async_engine.sync_engine)
@@ -0,0 +1,126 @@
+"""
+In-process LRU cache of serialized responses, with a time to live.
+
+Callers key the entries by the data version, so that no entry built before a write (made by
+any process) is served after it. The `crud` functions writing the data also clear the cache of
+their process, to free the entries which can no longer be served.
+
+The cache is configured with the following environment variables:
+
+- RESPONSE_CACHE_SIZE: the maximum number of entries (1024 by default, 0 disables the cache)
+- RESPONSE_CACHE_TTL: the time to live of the entries, in seconds (30 by default)
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass
+
+from fastapi import Response
+
+
+@dataclass
+class CachedResponse:
+    content: bytes
+    headers: dict[str, str]
+    expires_at: float
+
+    def to_response(self) -> Response:
+        return Response(self.content, media_type="application/json", headers=self.headers)
+
+
+class ResponseCache:
+    def __init__(self, name: str, max_entries: int, ttl: float):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, CachedResponse] = OrderedDict()
+        self._lock = threading.Lock()
+        # Incremented by every invalidation, so that a response computed before a write is not
+        # stored after the write evicted the entries it affects
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> CachedResponse | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key: Hashable, content: bytes, headers: dict[str, str], generation: int):
+        """
+        Store a response, unless the cache was invalidated since `generation` was read (before
+        querying the data of the response).
+        """
+        if self.max_entries <= 0:
+            return
+
+        with self._lock:
+            if generation != self.generation:
+                return
+
+            self._entries[key] = CachedResponse(content, headers, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]):
+        """
+        Evict the entries whose key matches the predicate.
+        """
+        with self._lock:
+            self.generation += 1
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                del self._entries[key]
+            self.invalidations += len(keys)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+# Pages of `GET /experiments/`, keyed by (team, include_descendants, limit, cursor, fields, expand,
+# min_sample_ratio, max_sample_ratio, sort, etag)
+experiments_cache = ResponseCache(
+    "experiments",
+    max_entries=int(os.getenv("RESPONSE_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("RESPONSE_CACHE_TTL", "30")),
+)
+
+# Response caches by name, for the metrics
+CACHES: dict[str, ResponseCache] = {experiments_cache.name: experiments_cache}
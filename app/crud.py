@@ -1,11 +1,16 @@
 import logging
+from collections.abc import Callable, Iterator
 
-from sqlalchemy import or_
+from fastapi import HTTPException
+from sqlalchemy import REAL, Table, and_, cast, func, insert, or_, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm import aliased, Session
+from sqlalchemy.orm import aliased, selectinload, Session
 
+from .cache import experiments_cache
 from .exceptions import (
     ExperimentNotFoundError,
+    ExperimentsBulkCreateError,
     TeamAlreadyExistsError,
     TeamCircularReferenceError,
     TeamDoubleAssignmentError,
@@ -13,33 +18,96 @@ from .exceptions import (
     TeamsNumberChangeError,
     TeamsNumberError,
 )
-from .models import Experiment, Team
+from .fieldsets import (
+    EXPERIMENT_FIELDS,
+    EXPERIMENT_RELATIONSHIPS,
+    TEAM_FIELDS,
+    TEAM_RELATIONSHIPS,
+)
+from .hierarchy import add_team_paths, move_subtree, remove_team_paths, subtree_ids
+from .models import Experiment, Team, experiment_team_association, team_closure
+from .search import ranked_matches, search_terms
 from .schemas import (
+    AncestryCheck,
     ExperimentCreate,
     ExperimentReassignTeams,
+    ExperimentSort,
     ExperimentUpdate,
     TeamBase,
     TeamCreate,
+    TeamImport,
     TeamUpdate,
 )
+from .team_index import get_team_index, invalidate_team_index
+from .versioning import DATA, TEAM_TREE, bump_version, get_version
+
+
+def _insert_ignoring_conflicts(db: Session, table: Table, index_elements: list[str]):
+    """
+    INSERT ... ON CONFLICT DO NOTHING, for the dialect of the session's database.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(table).on_conflict_do_nothing(index_elements=index_elements)
+    return sqlite.insert(table).on_conflict_do_nothing(index_elements=index_elements)
+
+
+def _create_missing_teams(db: Session, names: list[str]) -> dict[str, int]:
+    """
+    Create root teams with the given names, skipping the names taken in the meantime by
+    concurrent transactions instead of failing on the unique index. Returns the IDs of all
+    the given names.
+    """
+    created = dict(
+        db.execute(
+            _insert_ignoring_conflicts(db, Team.__table__, ["name"]).returning(
+                Team.__table__.c.name, Team.__table__.c.id
+            ),
+            [{"name": name} for name in names],
+        ).all()
+    )
+
+    if created:
+        db.execute(
+            insert(team_closure),
+            [
+                {"ancestor_id": team_id, "descendant_id": team_id, "depth": 0}
+                for team_id in created.values()
+            ],
+        )
+        bump_version(db, TEAM_TREE)
+
+    taken = [name for name in names if name not in created]
+    if taken:
+        created.update(db.execute(select(Team.name, Team.id).where(Team.name.in_(taken))).all())
+
+    return created
 
 
 def _add_teams_to_experiment(
     db: Session, experiment: Experiment, teams: list[TeamBase]
 ):
     try:
-        db_teams = []
+        team_index = get_team_index(db)
+
+        names = {team.name for team in teams}
+        db_teams = {
+            db_team.name: db_team
+            for db_team in db.scalars(select(Team).where(Team.name.in_(names)))
+        }
+        missing_names = sorted(names - db_teams.keys())
+        if missing_names:
+            team_ids = _create_missing_teams(db, missing_names)
+            db_teams.update(
+                (db_team.name, db_team)
+                for db_team in db.scalars(select(Team).where(Team.id.in_(team_ids.values())))
+            )
+
+        # Teams created above are roots without children, so the index needs no update
         for team in teams:
-            db_team = get_team_by_name(db, team.name)
-            if not db_team:
-                db_team = Team(**team.dict())
-                db.add(db_team)
-                db.flush()
-            db_teams.append(db_team)
-
-        for db_team in db_teams:
+            db_team = db_teams[team.name]
             if any(
-                other_db_team.is_descendant_of(db_team) for other_db_team in db_teams
+                team_index.is_ancestor(db_team.id, other_db_team.id)
+                for other_db_team in db_teams.values()
             ):
                 raise TeamCircularReferenceError()
 
@@ -54,32 +122,309 @@ def _add_teams_to_experiment(
         raise
 
 
-def get_experiment(db: Session, experiment_id: int) -> Experiment | None:
-    return db.query(Experiment).filter(Experiment.id == experiment_id).first()
+def _team_filter(team: str, include_descendants: bool):
+    """
+    Filter experiments assigned to a team (or, optionally, to any team of its subtree).
+    """
+    if include_descendants:
+        team_ids = subtree_ids(team)
+    else:
+        team_ids = select(Team.id).where(Team.name == team)
+
+    return Experiment.id.in_(
+        select(experiment_team_association.c.experiment_id).where(
+            experiment_team_association.c.team_id.in_(team_ids)
+        )
+    )
+
+
+def get_data_version(db: Session) -> int:
+    """
+    Version of the whole data set, incremented by every write.
+    """
+    return get_version(db, DATA)
+
+
+def _get_versioned_rows(
+    db: Session, get_rows: Callable[..., list[dict]], is_current: Callable[[int], bool], **kwargs
+) -> tuple[int, list[dict] | None]:
+    """
+    The data version, with the rows of `get_rows` unless `is_current(version)` tells that the
+    caller already has them (e.g. cached, or in a client's cache) and gets None instead. A
+    single call, so async and threaded callers make one trip to the database's worker.
+    """
+    version = get_data_version(db)
+    if is_current(version):
+        return version, None
+    return version, get_rows(db, **kwargs)
 
 
-def get_experiments(db: Session, team: str | None = None, include_descendants: bool = False):
+def get_experiment(db: Session, experiment_id: int) -> Experiment | None:
+    return (
+        db.query(Experiment)
+        .options(selectinload(Experiment.teams))
+        .filter(Experiment.id == experiment_id)
+        .first()
+    )
+
+
+def _experiment_filters(
+    team: str | None,
+    include_descendants: bool,
+    min_sample_ratio: float | None,
+    max_sample_ratio: float | None,
+    sort: ExperimentSort,
+    after_id: int | None,
+    after_sample_ratio: float | None,
+) -> tuple[list, list]:
+    """
+    The conditions and ordering of an experiment listing. The keyset condition compares the
+    sort key and the ID together, so a sort by sample ratio is served by the (sample_ratio, id)
+    index, in either direction.
+    """
+    where = []
+
     if team:
-        if include_descendants:
-            team_alias = aliased(Team)
-            descendants = db.query(team_alias).\
-                with_entities(team_alias.id).\
-                filter(team_alias.name == team).\
-                cte(name='descendants', recursive=True)
-
-            aliased_descendants = aliased(descendants, name='d')
-            recursive_query = db.query(Team.id).filter(Team.parent_id == aliased_descendants.c.id)
-            descendants = descendants.union_all(recursive_query)
-
-            return (
-                db.query(Experiment)
-                .filter(or_(Experiment.teams.any(Team.id.in_(descendants)), Experiment.teams.any(Team.name == team)))
-                .all()
-            )
-        else:
-            return db.query(Experiment).filter(Experiment.teams.any(Team.name == team)).all()
+        where.append(_team_filter(team, include_descendants))
+
+    if min_sample_ratio is not None:
+        where.append(Experiment.sample_ratio >= min_sample_ratio)
+
+    if max_sample_ratio is not None:
+        where.append(Experiment.sample_ratio <= max_sample_ratio)
+
+    descending = sort.startswith("-")
+    if sort.lstrip("-") == "sample_ratio":
+        key = tuple_(Experiment.sample_ratio, Experiment.id)
+        position = tuple_(after_sample_ratio, after_id)
+        order_by = [Experiment.sample_ratio, Experiment.id]
+    else:
+        key, position = Experiment.id, after_id
+        order_by = [Experiment.id]
+
+    if after_id is not None:
+        where.append(key < position if descending else key > position)
+
+    return where, [column.desc() for column in order_by] if descending else order_by
 
-    return db.query(Experiment).all()
+
+def get_experiments(
+    db: Session,
+    team: str | None = None,
+    include_descendants: bool = False,
+    limit: int | None = None,
+    after_id: int | None = None,
+    min_sample_ratio: float | None = None,
+    max_sample_ratio: float | None = None,
+    sort: ExperimentSort = "id",
+    after_sample_ratio: float | None = None,
+):
+    where, order_by = _experiment_filters(
+        team,
+        include_descendants,
+        min_sample_ratio,
+        max_sample_ratio,
+        sort,
+        after_id,
+        after_sample_ratio,
+    )
+    query = db.query(Experiment).options(selectinload(Experiment.teams)).filter(*where)
+    return query.order_by(*order_by).limit(limit).all()
+
+
+def _experiment_rows(
+    db: Session,
+    where: list,
+    limit: int | None,
+    fields: tuple[str, ...] = EXPERIMENT_FIELDS,
+    expand: tuple[str, ...] = EXPERIMENT_RELATIONSHIPS,
+    order_by: list | None = None,
+) -> list[dict]:
+    """
+    Dicts shaped like `schemas.Experiment`, restricted to the given fields and relationships,
+    built from column queries selecting only these (and the columns they are sorted by).
+    """
+    order_by = order_by or [Experiment.id]
+    sort_keys = {getattr(column, "element", column).key for column in order_by}
+    # In the order of the schema, with the ID always selected
+    columns = [
+        getattr(Experiment, field)
+        for field in ("description", "sample_ratio", "id")
+        if field in fields or field in sort_keys
+    ]
+    experiments = {
+        row.id: {**row._asdict(), **{relationship: [] for relationship in expand}}
+        for row in db.execute(select(*columns).where(*where).order_by(*order_by).limit(limit))
+    }
+
+    if "teams" in expand:
+        for experiment_ids in _chunks(list(experiments)):
+            for experiment_id, name in db.execute(
+                select(experiment_team_association.c.experiment_id, Team.name)
+                .join(Team, Team.id == experiment_team_association.c.team_id)
+                .where(experiment_team_association.c.experiment_id.in_(experiment_ids))
+            ):
+                experiments[experiment_id]["teams"].append({"name": name})
+
+    return list(experiments.values())
+
+
+def get_experiment_rows(
+    db: Session,
+    team: str | None = None,
+    include_descendants: bool = False,
+    limit: int | None = None,
+    after_id: int | None = None,
+    fields: tuple[str, ...] = EXPERIMENT_FIELDS,
+    expand: tuple[str, ...] = EXPERIMENT_RELATIONSHIPS,
+    min_sample_ratio: float | None = None,
+    max_sample_ratio: float | None = None,
+    sort: ExperimentSort = "id",
+    after_sample_ratio: float | None = None,
+) -> list[dict]:
+    """
+    Same as `get_experiments`, as dicts shaped like `schemas.Experiment` built from column
+    queries, so they can be serialized without loading ORM objects or validating them.
+    Optionally restricted to some fields and relationships (see `fieldsets`); the sample ratio
+    is always selected when sorting by it.
+    """
+    where, order_by = _experiment_filters(
+        team,
+        include_descendants,
+        min_sample_ratio,
+        max_sample_ratio,
+        sort,
+        after_id,
+        after_sample_ratio,
+    )
+    return _experiment_rows(db, where, limit, fields=fields, expand=expand, order_by=order_by)
+
+
+def get_versioned_experiment_rows(
+    db: Session, is_current: Callable[[int], bool], **kwargs
+) -> tuple[int, list[dict] | None]:
+    """
+    The data version with the rows of `get_experiment_rows(db, **kwargs)`, unless current (see
+    `_get_versioned_rows`).
+    """
+    return _get_versioned_rows(db, get_experiment_rows, is_current, **kwargs)
+
+
+def get_experiment_row(
+    db: Session,
+    experiment_id: int,
+    fields: tuple[str, ...] = EXPERIMENT_FIELDS,
+    expand: tuple[str, ...] = EXPERIMENT_RELATIONSHIPS,
+) -> dict | None:
+    rows = _experiment_rows(db, [Experiment.id == experiment_id], None, fields=fields, expand=expand)
+    return rows[0] if rows else None
+
+
+def search_experiment_rows(
+    db: Session,
+    query: str,
+    team: str | None = None,
+    include_descendants: bool = False,
+    limit: int | None = None,
+    after: tuple[float, int] | None = None,
+    fields: tuple[str, ...] = EXPERIMENT_FIELDS,
+    expand: tuple[str, ...] = EXPERIMENT_RELATIONSHIPS,
+) -> list[dict]:
+    """
+    The experiments whose description matches a search query (see `search`), best matches
+    first, as dicts shaped like `schemas.ExperimentSearchResult`. `after` is the (rank, ID) of
+    the last experiment of the previous page.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+
+    matches = ranked_matches(db.get_bind().dialect.name, terms).subquery()
+    statement = select(matches.c.id, matches.c.rank).join(Experiment, Experiment.id == matches.c.id)
+
+    if team:
+        statement = statement.where(_team_filter(team, include_descendants))
+
+    if after is not None:
+        # Ranks are compared with the precision they are computed with (a float4 on PostgreSQL)
+        rank, after_id = cast(after[0], REAL), after[1]
+        statement = statement.where(
+            or_(matches.c.rank < rank, and_(matches.c.rank == rank, matches.c.id > after_id))
+        )
+
+    ranks = dict(
+        db.execute(statement.order_by(matches.c.rank.desc(), matches.c.id).limit(limit)).all()
+    )
+    experiments = {
+        experiment["id"]: experiment
+        for experiment in _experiment_rows(
+            db, [Experiment.id.in_(ranks)], None, fields=fields, expand=expand
+        )
+    }
+    return [{**experiments[experiment_id], "rank": rank} for experiment_id, rank in ranks.items()]
+
+
+def export_experiments_statement(team: str | None = None, include_descendants: bool = False):
+    """
+    Select the experiments with their teams' names, one row per assignment, ordered by
+    experiment ID. See `group_exported_experiments`.
+    """
+    statement = (
+        select(Experiment.id, Experiment.description, Experiment.sample_ratio, Team.name)
+        .outerjoin(
+            experiment_team_association,
+            experiment_team_association.c.experiment_id == Experiment.id,
+        )
+        .outerjoin(Team, Team.id == experiment_team_association.c.team_id)
+        .order_by(Experiment.id)
+    )
+    if team:
+        statement = statement.where(_team_filter(team, include_descendants))
+    return statement
+
+
+def group_exported_experiments(experiment: dict | None, row) -> tuple[dict, dict | None]:
+    """
+    Fold a row of `export_experiments_statement` into the experiment being built. Returns the
+    experiment being built and the previous one if it is complete.
+    """
+    experiment_id, description, sample_ratio, team_name = row
+    completed = None
+    if experiment is None or experiment["id"] != experiment_id:
+        completed = experiment
+        experiment = {
+            "id": experiment_id,
+            "description": description,
+            "sample_ratio": sample_ratio,
+            "teams": [],
+        }
+    if team_name is not None:
+        experiment["teams"].append({"name": team_name})
+    return experiment, completed
+
+
+def export_experiments(
+    db: Session,
+    team: str | None = None,
+    include_descendants: bool = False,
+    batch_size: int = 1000,
+) -> Iterator[dict]:
+    """
+    Iterate over the experiments as plain dicts, reading them through a server-side cursor
+    `batch_size` rows at a time, so memory use does not depend on the number of experiments.
+    """
+    rows = db.execute(
+        export_experiments_statement(team, include_descendants).execution_options(
+            yield_per=batch_size
+        )
+    )
+    experiment = None
+    for row in rows:
+        experiment, completed = group_exported_experiments(experiment, row)
+        if completed is not None:
+            yield completed
+    if experiment is not None:
+        yield experiment
 
 
 def create_experiment(db: Session, experiment: ExperimentCreate):
@@ -96,8 +441,10 @@ def create_experiment(db: Session, experiment: ExperimentCreate):
         db.flush()
 
         _add_teams_to_experiment(db, db_experiment, teams)
+        bump_version(db, DATA)
 
         db.commit()
+        experiments_cache.clear()
         db.refresh(db_experiment)
 
     except SQLAlchemyError as e:
@@ -109,6 +456,99 @@ def create_experiment(db: Session, experiment: ExperimentCreate):
         return db_experiment
 
 
+def create_experiments(
+    db: Session, experiments: list[ExperimentCreate], atomic: bool = True
+) -> list[tuple[Experiment | None, HTTPException | None]]:
+    """
+    Create many experiments in a single transaction, with set-based statements: one query
+    resolves all the referenced teams and multi-row INSERTs create the missing teams, the
+    experiments and their team assignments.
+
+    With `atomic`, nothing is created if any experiment breaks the team constraints. Otherwise,
+    the valid experiments are created and the errors are returned next to the invalid ones.
+    """
+    if not experiments:
+        return []
+
+    try:
+        names = {team.name for experiment in experiments for team in experiment.teams}
+        team_ids = dict(
+            db.execute(select(Team.name, Team.id).where(Team.name.in_(names))).all()
+        )
+        team_index = get_team_index(db)
+
+        errors: dict[int, HTTPException] = {}
+        for index, experiment in enumerate(experiments):
+            experiment_names = [team.name for team in experiment.teams]
+            if not experiment_names or len(experiment_names) > 2:
+                errors[index] = TeamsNumberError()
+            elif len(set(experiment_names)) != len(experiment_names):
+                errors[index] = TeamDoubleAssignmentError()
+            elif len(experiment_names) == 2 and all(name in team_ids for name in experiment_names):
+                first_id, second_id = (team_ids[name] for name in experiment_names)
+                if team_index.is_ancestor(first_id, second_id) or team_index.is_ancestor(
+                    second_id, first_id
+                ):
+                    errors[index] = TeamCircularReferenceError()
+
+        if errors and atomic:
+            raise ExperimentsBulkCreateError(errors)
+
+        valid = [
+            (index, experiment)
+            for index, experiment in enumerate(experiments)
+            if index not in errors
+        ]
+
+        missing_names = sorted(
+            {team.name for _, experiment in valid for team in experiment.teams} - team_ids.keys()
+        )
+        if missing_names:
+            team_ids.update(_create_missing_teams(db, missing_names))
+
+        experiment_ids = []
+        if valid:
+            experiment_ids = db.scalars(
+                insert(Experiment).returning(Experiment.id, sort_by_parameter_order=True),
+                [
+                    {"description": experiment.description, "sample_ratio": experiment.sample_ratio}
+                    for _, experiment in valid
+                ],
+            ).all()
+            db.execute(
+                insert(experiment_team_association),
+                [
+                    {"experiment_id": experiment_id, "team_id": team_ids[team.name]}
+                    for experiment_id, (_, experiment) in zip(experiment_ids, valid)
+                    for team in experiment.teams
+                ],
+            )
+            bump_version(db, DATA)
+
+        db.commit()
+        if missing_names:
+            invalidate_team_index()
+        experiments_cache.clear()
+
+        db_experiments = {
+            db_experiment.id: db_experiment
+            for db_experiment in db.query(Experiment)
+            .options(selectinload(Experiment.teams))
+            .filter(Experiment.id.in_(experiment_ids))
+        }
+
+    except SQLAlchemyError as e:
+        logging.error(f"An error occurred while creating experiments in bulk: {e}")
+        db.rollback()
+        raise
+
+    else:
+        results = [(None, errors.get(index)) for index in range(len(experiments))]
+        for (index, _), experiment_id in zip(valid, experiment_ids):
+            results[index] = (db_experiments[experiment_id], None)
+        return results
+
+
 def update_experiment(db: Session, experiment: ExperimentUpdate, experiment_id: int):
     try:
         db_experiment = get_experiment(db, experiment_id=experiment_id)
@@ -117,8 +557,10 @@ def update_experiment(db: Session, experiment: ExperimentUpdate, experiment_id:
 
         db_experiment.description = experiment.description
         db_experiment.sample_ratio = experiment.sample_ratio
+        bump_version(db, DATA)
 
         db.commit()
+        experiments_cache.clear()
         db.refresh(db_experiment)
 
     except SQLAlchemyError as e:
@@ -144,8 +586,10 @@ def reassign_experiment_teams(
         db_experiment.teams = []
 
         _add_teams_to_experiment(db, db_experiment, experiment.teams)
+        bump_version(db, DATA)
 
         db.commit()
+        experiments_cache.clear()
         db.refresh(db_experiment)
 
     except SQLAlchemyError as e:
@@ -164,7 +608,9 @@ def delete_experiment(db: Session, experiment_id: int):
             raise ExperimentNotFoundError()
 
         db.delete(db_experiment)
+        bump_version(db, DATA)
         db.commit()
+        experiments_cache.clear()
 
     except SQLAlchemyError as e:
         logging.error(f"An error occurred while deleting an experiment: {e}")
@@ -175,8 +621,254 @@ def delete_experiment(db: Session, experiment_id: int):
         return None
 
 
-def get_teams(db: Session):
-    return db.query(Team).all()
+def get_teams(db: Session, limit: int | None = None, after_id: int | None = None):
+    query = db.query(Team).options(
+        selectinload(Team.children), selectinload(Team.experiments)
+    )
+
+    if after_id is not None:
+        query = query.filter(Team.id > after_id)
+
+    return query.order_by(Team.id).limit(limit).all()
+
+
+def _team_rows(
+    db: Session,
+    where: list,
+    limit: int | None,
+    fields: tuple[str, ...] = TEAM_FIELDS,
+    expand: tuple[str, ...] = TEAM_RELATIONSHIPS,
+) -> list[dict]:
+    """
+    Dicts shaped like `schemas.Team`, restricted to the given fields and relationships, built
+    from column queries selecting only these.
+    """
+    # In the order of the schema, with the ID always selected
+    columns = [
+        getattr(Team, field)
+        for field in ("name", "id", "parent_id")
+        if field in fields or field == "id"
+    ]
+    teams = {
+        row.id: {**row._asdict(), **{relationship: [] for relationship in expand}}
+        for row in db.execute(select(*columns).where(*where).order_by(Team.id).limit(limit))
+    }
+
+    for team_ids in _chunks(list(teams)):
+        if "children" in expand:
+            for parent_id, name, team_id in db.execute(
+                select(Team.parent_id, Team.name, Team.id).where(Team.parent_id.in_(team_ids))
+            ):
+                teams[parent_id]["children"].append({"name": name, "id": team_id})
+
+        if "experiments" in expand:
+            for team_id, description, sample_ratio in db.execute(
+                select(
+                    experiment_team_association.c.team_id,
+                    Experiment.description,
+                    Experiment.sample_ratio,
+                )
+                .join(Experiment, Experiment.id == experiment_team_association.c.experiment_id)
+                .where(experiment_team_association.c.team_id.in_(team_ids))
+            ):
+                teams[team_id]["experiments"].append(
+                    {"description": description, "sample_ratio": sample_ratio}
+                )
+
+    return list(teams.values())
+
+
+def get_team_rows(
+    db: Session,
+    limit: int | None = None,
+    after_id: int | None = None,
+    fields: tuple[str, ...] = TEAM_FIELDS,
+    expand: tuple[str, ...] = TEAM_RELATIONSHIPS,
+) -> list[dict]:
+    """
+    Same as `get_teams`, as dicts shaped like `schemas.Team` built from column queries.
+    Optionally restricted to some fields and relationships (see `fieldsets`).
+    """
+    where = [Team.id > after_id] if after_id is not None else []
+    return _team_rows(db, where, limit, fields=fields, expand=expand)
+
+
+def get_versioned_team_rows(
+    db: Session, is_current: Callable[[int], bool], **kwargs
+) -> tuple[int, list[dict] | None]:
+    """
+    The data version with the rows of `get_team_rows(db, **kwargs)`, unless current (see
+    `_get_versioned_rows`).
+    """
+    return _get_versioned_rows(db, get_team_rows, is_current, **kwargs)
+
+
+def get_team_row(
+    db: Session,
+    team_name: str,
+    fields: tuple[str, ...] = TEAM_FIELDS,
+    expand: tuple[str, ...] = TEAM_RELATIONSHIPS,
+) -> dict | None:
+    rows = _team_rows(db, [Team.name == team_name], None, fields=fields, expand=expand)
+    return rows[0] if rows else None
+
+
+def get_team_tree(
+    db: Session,
+    team_name: str,
+    max_depth: int | None = None,
+    with_experiment_counts: bool = False,
+) -> dict | None:
+    """
+    The subtree of a team (down to `max_depth` levels below it), as nested dicts shaped like
+    `schemas.TeamTree`. The whole subtree is fetched with one query on the closure table, ordered
+    by depth so that every parent is seen before its children, and assembled in a single pass.
+    """
+    ancestor = aliased(Team)
+    query = (
+        select(Team.id, Team.name, Team.parent_id, team_closure.c.depth)
+        .join(team_closure, team_closure.c.descendant_id == Team.id)
+        .join(ancestor, ancestor.id == team_closure.c.ancestor_id)
+        .where(ancestor.name == team_name)
+    )
+
+    if max_depth is not None:
+        query = query.where(team_closure.c.depth <= max_depth)
+
+    if with_experiment_counts:
+        counts = (
+            select(
+                experiment_team_association.c.team_id,
+                func.count().label("experiment_count"),
+            )
+            .where(experiment_team_association.c.team_id.in_(subtree_ids(team_name)))
+            .group_by(experiment_team_association.c.team_id)
+            .subquery()
+        )
+        query = query.add_columns(
+            func.coalesce(counts.c.experiment_count, 0).label("experiment_count")
+        ).outerjoin(counts, counts.c.team_id == Team.id)
+
+    root = None
+    nodes: dict[int, dict] = {}
+    for row in db.execute(query.order_by(team_closure.c.depth, Team.id)):
+        node = {"name": row.name, "id": row.id}
+        if with_experiment_counts:
+            node["experiment_count"] = row.experiment_count
+        node["children"] = []
+        nodes[row.id] = node
+
+        if row.depth == 0:
+            root = node
+        else:
+            nodes[row.parent_id]["children"].append(node)
+
+    return root
+
+
+def get_team_ancestors(db: Session, team_name: str) -> list[dict] | None:
+    """
+    The ancestors of a team, from its parent up to the root, with their distance to the team,
+    as dicts shaped like `schemas.TeamAncestor`. None if the team does not exist.
+    """
+    descendant = aliased(Team)
+    rows = db.execute(
+        select(Team.name, Team.id, team_closure.c.depth)
+        .join(team_closure, team_closure.c.ancestor_id == Team.id)
+        .join(descendant, descendant.id == team_closure.c.descendant_id)
+        .where(descendant.name == team_name)
+        .order_by(team_closure.c.depth)
+    ).all()
+    if not rows:
+        return None
+
+    # The first row is the team itself, at depth 0
+    return [row._asdict() for row in rows[1:]]
+
+
+def check_ancestry(db: Session, pairs: list[AncestryCheck]) -> list[bool | None]:
+    """
+    Whether the first team of each pair is a strict ancestor of the second one, answered from
+    the team index without querying the teams. None for pairs with an unknown team.
+    """
+    team_index = get_team_index(db)
+    results = []
+    for pair in pairs:
+        ancestor_id = team_index.ids.get(pair.ancestor)
+        descendant_id = team_index.ids.get(pair.descendant)
+        if ancestor_id is None or descendant_id is None:
+            results.append(None)
+        else:
+            results.append(team_index.is_ancestor(ancestor_id, descendant_id))
+    return results
+
+
+def get_team_stats(
+    db: Session,
+    team: str | None = None,
+    limit: int | None = None,
+    after_id: int | None = None,
+) -> list[dict]:
+    """
+    Per-team experiment counts and average sample ratios, both of the experiments assigned to
+    the team and of the (distinct) experiments assigned to any team of its subtree, as dicts
+    shaped like `schemas.TeamStats`. Aggregated in one query, for a page of teams ordered by ID.
+    """
+    page = select(Team.id, Team.name)
+    if team:
+        page = page.where(Team.name == team)
+    if after_id is not None:
+        page = page.where(Team.id > after_id)
+    page = page.order_by(Team.id).limit(limit).cte("page")
+
+    direct = (
+        select(
+            experiment_team_association.c.team_id,
+            func.count().label("experiment_count"),
+            func.avg(Experiment.sample_ratio).label("avg_sample_ratio"),
+        )
+        .join(Experiment, Experiment.id == experiment_team_association.c.experiment_id)
+        .where(experiment_team_association.c.team_id.in_(select(page.c.id)))
+        .group_by(experiment_team_association.c.team_id)
+        .subquery()
+    )
+
+    # An experiment assigned to two teams of a subtree counts once for the subtree
+    subtree_experiments = (
+        select(team_closure.c.ancestor_id, experiment_team_association.c.experiment_id)
+        .join(
+            experiment_team_association,
+            experiment_team_association.c.team_id == team_closure.c.descendant_id,
+        )
+        .where(team_closure.c.ancestor_id.in_(select(page.c.id)))
+        .distinct()
+        .subquery()
+    )
+    subtree = (
+        select(
+            subtree_experiments.c.ancestor_id,
+            func.count().label("experiment_count"),
+            func.avg(Experiment.sample_ratio).label("avg_sample_ratio"),
+        )
+        .join(Experiment, Experiment.id == subtree_experiments.c.experiment_id)
+        .group_by(subtree_experiments.c.ancestor_id)
+        .subquery()
+    )
+
+    query = (
+        select(
+            page.c.name,
+            page.c.id,
+            func.coalesce(direct.c.experiment_count, 0).label("experiment_count"),
+            direct.c.avg_sample_ratio,
+            func.coalesce(subtree.c.experiment_count, 0).label("subtree_experiment_count"),
+            subtree.c.avg_sample_ratio.label("subtree_avg_sample_ratio"),
+        )
+        .outerjoin(direct, direct.c.team_id == page.c.id)
+        .outerjoin(subtree, subtree.c.ancestor_id == page.c.id)
+        .order_by(page.c.id)
+    )
+    return [row._asdict() for row in db.execute(query)]
 
 
 def get_team_by_id(db: Session, team_id: int):
@@ -195,7 +887,13 @@ def create_team(db: Session, team: TeamCreate):
 
         db_team = Team(**team.dict())
         db.add(db_team)
+        db.flush()
+        add_team_paths(db, db_team.id, parent_id=db_team.parent_id)
+        bump_version(db, TEAM_TREE)
+        bump_version(db, DATA)
+
         db.commit()
+        invalidate_team_index()
         db.refresh(db_team)
 
     except SQLAlchemyError as e:
@@ -207,22 +905,133 @@ def create_team(db: Session, team: TeamCreate):
         return db_team
 
 
+def _chunks(items: list, size: int = 10000):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def import_teams(db: Session, teams: list[TeamImport]) -> list[tuple[str, int, int | None]]:
+    """
+    Create a whole forest of teams, given by name and parent name. Parents may be other teams
+    of the forest or existing teams.
+
+    The teams are inserted level by level (parents first) with one multi-row INSERT per level,
+    and their closure rows are computed in memory from their parent's, so no statement is
+    executed per team. Returns the (name, id, parent_id) of the created teams.
+    """
+    try:
+        parents = {team.name: team.parent for team in teams}
+        if len(parents) != len(teams):
+            raise TeamAlreadyExistsError()
+
+        for names in _chunks(list(parents)):
+            if db.scalar(select(Team.id).where(Team.name.in_(names)).limit(1)) is not None:
+                raise TeamAlreadyExistsError()
+
+        existing_parent_names = list(
+            {parent for parent in parents.values() if parent is not None} - parents.keys()
+        )
+        team_ids: dict[str, int] = {}
+        for names in _chunks(existing_parent_names):
+            team_ids.update(db.execute(select(Team.name, Team.id).where(Team.name.in_(names))).all())
+        if len(team_ids) != len(existing_parent_names):
+            raise TeamNotFoundError()
+
+        children: dict[str | None, list[str]] = {}
+        for name, parent in parents.items():
+            children.setdefault(parent if parent in parents else None, []).append(name)
+
+        levels = []
+        level = children.get(None, [])
+        while level:
+            levels.append(level)
+            level = [child for name in level for child in children.get(name, [])]
+
+        # Teams which are never reached from a root are part of a cycle
+        if sum(len(level) for level in levels) != len(teams):
+            raise TeamCircularReferenceError()
+
+        # Closure paths, as (ancestor_id, depth) pairs, of the parents of the current level
+        paths: dict[int, list[tuple[int, int]]] = {}
+        for team_ids_chunk in _chunks(list(team_ids.values())):
+            for ancestor_id, descendant_id, depth in db.execute(
+                select(
+                    team_closure.c.ancestor_id, team_closure.c.descendant_id, team_closure.c.depth
+                ).where(team_closure.c.descendant_id.in_(team_ids_chunk))
+            ):
+                paths.setdefault(descendant_id, []).append((ancestor_id, depth))
+
+        created = []
+        for level in levels:
+            team_ids.update(
+                db.execute(
+                    insert(Team).returning(Team.name, Team.id),
+                    [
+                        {"name": name, "parent_id": team_ids.get(parents[name])}
+                        for name in level
+                    ],
+                ).all()
+            )
+
+            level_paths = {}
+            for name in level:
+                team_id = team_ids[name]
+                parent_id = team_ids.get(parents[name])
+                level_paths[team_id] = [(team_id, 0)] + [
+                    (ancestor_id, depth + 1) for ancestor_id, depth in paths.get(parent_id, [])
+                ]
+                created.append((name, team_id, parent_id))
+            db.execute(
+                insert(team_closure),
+                [
+                    {"ancestor_id": ancestor_id, "descendant_id": team_id, "depth": depth}
+                    for team_id, team_paths in level_paths.items()
+                    for ancestor_id, depth in team_paths
+                ],
+            )
+
+            paths = level_paths
+
+        bump_version(db, TEAM_TREE)
+        bump_version(db, DATA)
+        db.commit()
+        invalidate_team_index()
+
+    except SQLAlchemyError as e:
+        logging.error(f"An error occurred while importing teams: {e}")
+        db.rollback()
+        raise
+
+    else:
+        return created
+
+
 def update_team(db: Session, team: TeamUpdate, team_name: str):
     try:
         db_team = get_team_by_name(db, team_name=team_name)
         if db_team is None:
             raise TeamNotFoundError()
 
-        if db_team.parent is not None and db_team.parent.is_descendant_of(db_team):
+        if team.parent_id is not None and (
+            team.parent_id == db_team.id
+            or get_team_index(db).is_ancestor(db_team.id, team.parent_id)
+        ):
             logging.error(
                 "Attempted to set a team's descendant as its parent. Aborting team update."
             )
             raise TeamCircularReferenceError()
 
+        if team.parent_id != db_team.parent_id:
+            move_subtree(db, db_team.id, new_parent_id=team.parent_id)
+
         db_team.name = team.name
         db_team.parent_id = team.parent_id
+        bump_version(db, TEAM_TREE)
+        bump_version(db, DATA)
 
         db.commit()
+        invalidate_team_index()
+        experiments_cache.clear()
         db.refresh(db_team)
 
     except SQLAlchemyError as e:
@@ -240,8 +1049,14 @@ def delete_team(db: Session, team_name: str):
         if db_team is None:
             raise TeamNotFoundError()
 
+        remove_team_paths(db, db_team.id)
         db.delete(db_team)
+        bump_version(db, TEAM_TREE)
+        bump_version(db, DATA)
+
         db.commit()
+        invalidate_team_index()
+        experiments_cache.clear()
 
     except SQLAlchemyError as e:
         logging.error(f"An error occurred while deleting a team: {e}")
@@ -1,20 +1,61 @@
 import os
 
 from dotenv import load_dotenv
+from fastapi import Depends, Request
 from sqlalchemy import create_engine
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+
+from .pooling import get_pool_options
+from .replication import reads_own_writes
 
 load_dotenv()
 
-SQLALCHEMY_DATABASE_URL = (
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL") or (
     f"postgresql+psycopg2://{os.getenv('POSTGRES_USER')}:{os.getenv('POSTGRES_PASSWORD')}"
     f"@{os.getenv('POSTGRES_SERVER')}:{os.getenv('POSTGRES_PORT')}/{os.getenv('POSTGRES_DB')}"
 )
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+# Optional read replica of the primary, serving the GET routes (see `replication`)
+REPLICA_DATABASE_URL = os.getenv("REPLICA_DATABASE_URL")
+
+# Serve requests with async routes and an async engine instead of sync routes in the threadpool
+ASYNC_MODE = os.getenv("ASYNC_MODE", "false").lower() in ("1", "true", "yes")
+
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+
+def get_async_url(url: str) -> URL:
+    """
+    Swap the driver of a database URL for its async counterpart.
+    """
+    url = make_url(url)
+    backend = url.get_backend_name()
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **get_pool_options("primary"))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+ReplicaSessionLocal = AsyncReplicaSessionLocal = None
+if REPLICA_DATABASE_URL:
+    replica_engine = create_engine(REPLICA_DATABASE_URL, **get_pool_options("replica"))
+    ReplicaSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+
+if ASYNC_MODE:
+    async_engine = create_async_engine(
+        get_async_url(SQLALCHEMY_DATABASE_URL), **get_pool_options("primary_async", is_async=True)
+    )
+    AsyncSessionLocal = async_sessionmaker(autoflush=False, bind=async_engine)
+
+    if REPLICA_DATABASE_URL:
+        async_replica_engine = create_async_engine(
+            get_async_url(REPLICA_DATABASE_URL), **get_pool_options("replica_async", is_async=True)
+        )
+        AsyncReplicaSessionLocal = async_sessionmaker(autoflush=False, bind=async_replica_engine)
+
 Base = declarative_base()
 
 
@@ -24,3 +65,50 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def open_read_session(primary: bool = False) -> Session:
+    """
+    Open a session of the read replica if one is configured, or of the primary (always with
+    `primary`), for reads outliving the request's dependencies (e.g. streamed responses).
+    """
+    if ReplicaSessionLocal is None or primary:
+        return SessionLocal()
+    return ReplicaSessionLocal()
+
+
+def open_async_read_session(primary: bool = False) -> AsyncSession:
+    if AsyncReplicaSessionLocal is None or primary:
+        return AsyncSessionLocal()
+    return AsyncReplicaSessionLocal()
+
+
+def get_read_db(request: Request, primary_db: Session = Depends(get_db)):
+    """
+    Session of the read replica if one is configured, unless the client has to read its own
+    writes from the primary. Sessions are only connected when first used, so the unused primary
+    session costs nothing.
+    """
+    if ReplicaSessionLocal is None or reads_own_writes(request):
+        yield primary_db
+        return
+
+    db = ReplicaSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db(request: Request, primary_db: AsyncSession = Depends(get_async_db)):
+    if AsyncReplicaSessionLocal is None or reads_own_writes(request):
+        yield primary_db
+        return
+
+    async with AsyncReplicaSessionLocal() as db:
+        yield db
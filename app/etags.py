@@ -0,0 +1,24 @@
+from fastapi import Response
+
+
+def make_etag(version: int) -> str:
+    """
+    Strong ETag of a response which only depends on the request and the data version.
+    """
+    return f'"{version}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """
+    Whether an If-None-Match header matches an ETag, using the weak comparison of RFC 9110
+    (an entity tag matches regardless of its W/ prefix, and * matches any).
+    """
+    if not if_none_match:
+        return False
+
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in (tag.removeprefix("W/") for tag in tags)
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
@@ -53,3 +53,27 @@ class TeamCircularReferenceError(HTTPException):
 class ExperimentNotFoundError(HTTPException):
     def __init__(self):
         super().__init__(status_code=404, detail="Experiment not found")
+
+
+class InvalidCursorError(HTTPException):
+    def __init__(self):
+        super().__init__(status_code=400, detail="Invalid pagination cursor")
+
+
+class ExperimentsBulkCreateError(HTTPException):
+    def __init__(self, errors: dict[int, HTTPException]):
+        super().__init__(
+            status_code=400,
+            detail=[
+                {"index": index, "detail": error.detail}
+                for index, error in sorted(errors.items())
+            ],
+        )
+
+
+class InvalidFieldsError(HTTPException):
+    def __init__(self, parameter: str, names: list[str], allowed: tuple[str, ...]):
+        super().__init__(
+            status_code=400,
+            detail=f"Unknown {parameter}: {', '.join(names)}. Allowed values: {', '.join(allowed)}",
+        )
@@ -0,0 +1,32 @@
+"""
+Sparse fieldsets of the experiment and team endpoints.
+
+`fields` selects the scalar fields to return (the `id` is always returned) and `expand` the
+relationships, both as comma-separated names. Without them, every field and relationship is
+returned, matching the response models.
+"""
+
+from .exceptions import InvalidFieldsError
+
+EXPERIMENT_FIELDS = ("description", "sample_ratio")
+EXPERIMENT_RELATIONSHIPS = ("teams",)
+
+TEAM_FIELDS = ("name", "parent_id")
+TEAM_RELATIONSHIPS = ("children", "experiments")
+
+
+def parse_fieldset(value: str | None, allowed: tuple[str, ...], parameter: str) -> tuple[str, ...]:
+    """
+    Parse a comma-separated list of names, rejecting the unknown ones. Returns all the allowed
+    names if the value is missing, and the names in their canonical order otherwise, so that
+    equivalent values give equal results.
+    """
+    if value is None:
+        return allowed
+
+    names = {name.strip() for name in value.split(",") if name.strip()}
+    unknown = sorted(names - set(allowed))
+    if unknown:
+        raise InvalidFieldsError(parameter, unknown, allowed)
+
+    return tuple(name for name in allowed if name in names)
@@ -0,0 +1,97 @@
+"""
+Maintenance of the `team_closure` table, which materializes the team hierarchy so that
+ancestor and descendant lookups are single indexed queries regardless of the tree depth.
+
+The functions below only execute statements; committing is up to the caller.
+"""
+
+from sqlalchemy import delete, insert, literal, select, true
+from sqlalchemy.orm import Session, aliased
+
+from .models import Team, team_closure
+
+
+def add_team_paths(db: Session, team_id: int, parent_id: int | None):
+    """
+    Insert the closure rows of a newly created (childless) team.
+    """
+    parent_paths = select(
+        team_closure.c.ancestor_id, literal(team_id), team_closure.c.depth + 1
+    ).where(team_closure.c.descendant_id == parent_id)
+    self_path = select(literal(team_id), literal(team_id), literal(0))
+
+    db.execute(
+        insert(team_closure).from_select(
+            ["ancestor_id", "descendant_id", "depth"],
+            self_path.union_all(parent_paths) if parent_id is not None else self_path,
+        )
+    )
+
+
+def move_subtree(db: Session, team_id: int, new_parent_id: int | None):
+    """
+    Re-link the subtree rooted at `team_id` under `new_parent_id` (or make it a root).
+    """
+    subtree = select(team_closure.c.descendant_id).where(
+        team_closure.c.ancestor_id == team_id
+    )
+    ancestors = select(team_closure.c.ancestor_id).where(
+        team_closure.c.descendant_id == team_id, team_closure.c.depth > 0
+    )
+    db.execute(
+        delete(team_closure).where(
+            team_closure.c.descendant_id.in_(subtree),
+            team_closure.c.ancestor_id.in_(ancestors),
+        )
+    )
+
+    if new_parent_id is None:
+        return
+
+    supertree = aliased(team_closure)
+    subtree = aliased(team_closure)
+    db.execute(
+        insert(team_closure).from_select(
+            ["ancestor_id", "descendant_id", "depth"],
+            select(
+                supertree.c.ancestor_id,
+                subtree.c.descendant_id,
+                supertree.c.depth + subtree.c.depth + 1,
+            )
+            .select_from(supertree.join(subtree, true()))
+            .where(
+                supertree.c.descendant_id == new_parent_id,
+                subtree.c.ancestor_id == team_id,
+            ),
+        )
+    )
+
+
+def remove_team_paths(db: Session, team_id: int):
+    """
+    Delete every closure row of a team that is about to be deleted. Its children become roots,
+    mirroring the ORM, which sets their `parent_id` to NULL.
+    """
+    subtree = select(team_closure.c.descendant_id).where(
+        team_closure.c.ancestor_id == team_id
+    )
+    ancestors = select(team_closure.c.ancestor_id).where(
+        team_closure.c.descendant_id == team_id
+    )
+    db.execute(
+        delete(team_closure).where(
+            team_closure.c.descendant_id.in_(subtree),
+            team_closure.c.ancestor_id.in_(ancestors),
+        )
+    )
+
+
+def subtree_ids(team_name: str):
+    """
+    Select the IDs of a team and all of its descendants, by the team's name.
+    """
+    return (
+        select(team_closure.c.descendant_id)
+        .join(Team, Team.id == team_closure.c.ancestor_id)
+        .where(Team.name == team_name)
+    )
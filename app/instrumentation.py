@@ -0,0 +1,176 @@
+"""
+Request and database instrumentation, recorded per route template into `metrics.REGISTRY`.
+
+`MetricsMiddleware` records the latency, in-flight requests and status codes of every request,
+and SQLAlchemy cursor events attribute each query, and its duration, to the route of the
+request executing it.
+"""
+
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from sqlalchemy import Engine, event
+from sqlalchemy.pool import QueuePool
+from starlette.routing import Match
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .cache import CACHES
+from .metrics import REGISTRY, MetricFamily
+from .pooling import POOL_WAIT_TIME, POOLS
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+REQUESTS = REGISTRY.counter(
+    "http_requests_total", "Number of HTTP requests", ("method", "route", "status")
+)
+REQUEST_DURATION = REGISTRY.histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route")
+)
+REQUESTS_IN_PROGRESS = REGISTRY.gauge(
+    "http_requests_in_progress", "Number of HTTP requests being served", ("method", "route")
+)
+REQUEST_DB_QUERIES = REGISTRY.histogram(
+    "http_request_db_queries",
+    "Number of database queries per HTTP request",
+    ("method", "route"),
+    buckets=QUERY_COUNT_BUCKETS,
+)
+REQUEST_DB_DURATION = REGISTRY.histogram(
+    "http_request_db_duration_seconds",
+    "Time spent in database queries per HTTP request",
+    ("method", "route"),
+)
+DB_QUERY_DURATION = REGISTRY.histogram(
+    "db_query_duration_seconds", "Database query latency", ("method", "route", "operation")
+)
+
+
+@dataclass
+class RequestStats:
+    method: str
+    route: str
+    queries: int = 0
+    db_time: float = 0.0
+
+
+_request_stats: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+def _get_route_template(app: ASGIApp, scope: Scope) -> str:
+    partial_match = None
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+        if match == Match.PARTIAL and partial_match is None:
+            partial_match = route.path
+    return partial_match or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = _get_route_template(scope["app"], scope)
+        stats = RequestStats(method=method, route=route)
+        token = _request_stats.set(stats)
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_progress = REQUESTS_IN_PROGRESS.labels(method, route)
+        in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUEST_DURATION.labels(method, route).observe(time.perf_counter() - start)
+            in_progress.dec()
+            REQUESTS.labels(method, route, str(status)).inc()
+            REQUEST_DB_QUERIES.labels(method, route).observe(stats.queries)
+            REQUEST_DB_DURATION.labels(method, route).observe(stats.db_time)
+            _request_stats.reset(token)
+
+
+# The start time is kept on the execution context of the statement rather than on the
+# connection, so that a statement which fails (and never gets `after_cursor_execute`) leaves
+# nothing behind on the pooled connection
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_start_time = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - context._query_start_time
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "UNKNOWN"
+    stats = _request_stats.get()
+    if stats is None:
+        # Queries executed outside of a request, e.g. by scripts
+        DB_QUERY_DURATION.labels("", UNMATCHED_ROUTE, operation).observe(duration)
+        return
+
+    stats.queries += 1
+    stats.db_time += duration
+    DB_QUERY_DURATION.labels(stats.method, stats.route, operation).observe(duration)
+
+
+def _collect_pool_metrics() -> list[MetricFamily]:
+    checked_out = MetricFamily(
+        "db_pool_checked_out", "Number of connections checked out of the pool", "gauge", ("pool",)
+    )
+    overflow = MetricFamily(
+        "db_pool_overflow", "Number of overflow connections of the pool", "gauge", ("pool",)
+    )
+    wait_time = MetricFamily(
+        "db_pool_wait_seconds", "Time spent waiting for a pooled connection", "histogram", ("pool",)
+    )
+    for pool_name, pool in list(POOLS.items()):
+        if isinstance(pool, QueuePool):
+            checked_out.labels(str(pool_name)).set(pool.checkedout())
+            overflow.labels(str(pool_name)).set(pool.overflow())
+    for pool_name, histogram in list(POOL_WAIT_TIME.items()):
+        wait_time.add_child((str(pool_name),), histogram)
+    return [checked_out, overflow, wait_time]
+
+
+REGISTRY.register_collector(_collect_pool_metrics)
+
+
+def _collect_cache_metrics() -> list[MetricFamily]:
+    size = MetricFamily("response_cache_entries", "Number of cached responses", "gauge", ("cache",))
+    counters = {
+        "hits": MetricFamily("response_cache_hits_total", "Number of cache hits", "counter", ("cache",)),
+        "misses": MetricFamily("response_cache_misses_total", "Number of cache misses", "counter", ("cache",)),
+        "evictions": MetricFamily(
+            "response_cache_evictions_total", "Number of entries evicted to make room", "counter", ("cache",)
+        ),
+        "expirations": MetricFamily(
+            "response_cache_expirations_total", "Number of entries expired", "counter", ("cache",)
+        ),
+        "invalidations": MetricFamily(
+            "response_cache_invalidations_total", "Number of entries evicted by writes", "counter", ("cache",)
+        ),
+    }
+    for cache_name, cache in list(CACHES.items()):
+        stats = cache.stats()
+        size.labels(cache_name).set(stats["size"])
+        for stat, family in counters.items():
+            family.labels(cache_name).inc(stats[stat])
+    return [size, *counters.values()]
+
+
+REGISTRY.register_collector(_collect_cache_metrics)
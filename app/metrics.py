@@ -0,0 +1,186 @@
+"""
+Minimal in-process metrics, exposed in the Prometheus text format by `generate_latest`.
+"""
+
+import threading
+from bisect import bisect_left
+from collections.abc import Callable
+
+# Upper bounds, in seconds, of the latency histogram buckets
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+
+class Gauge(Counter):
+    def dec(self, amount: float = 1.0):
+        self.inc(-amount)
+
+    def set(self, value: float):
+        with self._lock:
+            self.value = value
+
+
+class Histogram:
+    """
+    Thread-safe histogram of observed values with fixed bucket upper bounds.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.bucket_counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.bucket_counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def cumulative_counts(self) -> list[tuple[float, int]]:
+        """
+        (upper bound, number of observations lower than or equal to it) pairs, ending with +inf.
+        """
+        with self._lock:
+            bucket_counts = list(self.bucket_counts)
+        cumulative, total = [], 0
+        for upper_bound, bucket_count in zip(self.buckets + (float("inf"),), bucket_counts):
+            total += bucket_count
+            cumulative.append((upper_bound, total))
+        return cumulative
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": {str(upper_bound): count for upper_bound, count in self.cumulative_counts()},
+        }
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in labels.items()
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    value = float(value)
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+class MetricFamily:
+    """
+    A named metric with one child (Counter, Gauge or Histogram) per combination of label values.
+    """
+
+    _types = {"counter": Counter, "gauge": Gauge, "histogram": Histogram}
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        metric_type: str,
+        label_names: tuple[str, ...] = (),
+        buckets: tuple[float, ...] | None = None,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.metric_type = metric_type
+        self.label_names = label_names
+        self.buckets = buckets
+        self._children: dict[tuple[str, ...], Counter | Gauge | Histogram] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *label_values: str):
+        child = self._children.get(label_values)
+        if child is None:
+            with self._lock:
+                child = self._children.get(label_values)
+                if child is None:
+                    if self.metric_type == "histogram" and self.buckets is not None:
+                        child = Histogram(self.buckets)
+                    else:
+                        child = self._types[self.metric_type]()
+                    self._children[label_values] = child
+        return child
+
+    def add_child(self, label_values: tuple[str, ...], child: Counter | Gauge | Histogram):
+        """
+        Expose an existing Counter, Gauge or Histogram under the given label values.
+        """
+        with self._lock:
+            self._children[label_values] = child
+
+    def collect(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        for label_values, child in sorted(self._children.items()):
+            labels = dict(zip(self.label_names, label_values))
+            if isinstance(child, Histogram):
+                for upper_bound, count in child.cumulative_counts():
+                    bucket_labels = _format_labels({**labels, "le": _format_value(upper_bound)})
+                    lines.append(f"{self.name}_bucket{bucket_labels} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(child.sum)}")
+                lines.append(f"{self.name}_count{_format_labels(labels)} {child.count}")
+            else:
+                lines.append(f"{self.name}{_format_labels(labels)} {_format_value(child.value)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._families: list[MetricFamily] = []
+        self._collectors: list[Callable[[], list[MetricFamily]]] = []
+
+    def register(self, family: MetricFamily) -> MetricFamily:
+        self._families.append(family)
+        return family
+
+    def register_collector(self, collector: Callable[[], list[MetricFamily]]):
+        """
+        Register a function building metric families at collection time, for values which are
+        read from elsewhere rather than recorded.
+        """
+        self._collectors.append(collector)
+
+    def counter(self, name: str, documentation: str, label_names: tuple[str, ...] = ()) -> MetricFamily:
+        return self.register(MetricFamily(name, documentation, "counter", label_names))
+
+    def gauge(self, name: str, documentation: str, label_names: tuple[str, ...] = ()) -> MetricFamily:
+        return self.register(MetricFamily(name, documentation, "gauge", label_names))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        label_names: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> MetricFamily:
+        return self.register(MetricFamily(name, documentation, "histogram", label_names, buckets))
+
+    def generate_latest(self) -> str:
+        families = list(self._families)
+        for collector in self._collectors:
+            families.extend(collector())
+        return "\n".join(line for family in families for line in family.collect()) + "\n"
+
+
+REGISTRY = Registry()
+
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
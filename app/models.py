@@ -1,7 +1,22 @@
 from __future__ import annotations
 
-from sqlalchemy import Column, ForeignKey, Table
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import (
+    DDL,
+    Column,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Table,
+    column,
+    event,
+    exists,
+    func,
+    select,
+    table,
+    text,
+)
+from sqlalchemy.orm import Mapped, mapped_column, object_session, relationship
 
 from .database import Base
 
@@ -9,28 +24,77 @@ experiment_team_association = Table(
     "experiment_team",
     Base.metadata,
     Column("experiment_id", ForeignKey("experiment.id"), primary_key=True),
-    Column("team_id", ForeignKey("team.id"), primary_key=True),
+    # The primary key only serves lookups by experiment
+    Column("team_id", ForeignKey("team.id"), primary_key=True, index=True),
+)
+
+# Closure table of the team hierarchy: one row for every (ancestor, descendant) pair,
+# including a depth 0 row linking each team to itself. Maintained by `app.hierarchy`.
+team_closure = Table(
+    "team_closure",
+    Base.metadata,
+    Column("ancestor_id", ForeignKey("team.id"), primary_key=True),
+    Column("descendant_id", ForeignKey("team.id"), primary_key=True, index=True),
+    Column("depth", Integer, nullable=False),
 )
 
 
 class Experiment(Base):
     __tablename__ = "experiment"
+    # Serves both the range filters on the sample ratio and the keyset pages sorted by it
+    __table_args__ = (Index("ix_experiment_sample_ratio_id", "sample_ratio", "id"),)
 
     id: Mapped[int] = mapped_column(primary_key=True)
     description: Mapped[str] = mapped_column(nullable=False, index=True)
-    sample_ratio: Mapped[float] = mapped_column(nullable=False, index=True)
+    sample_ratio: Mapped[float] = mapped_column(nullable=False)
 
     teams: Mapped[list[Team]] = relationship(
         secondary=experiment_team_association, back_populates="experiments"
     )
 
 
+# Full-text search over the experiment descriptions (see `app.search`). On PostgreSQL, a GIN
+# index on their text search vector, which queries must spell exactly like this expression
+experiment_search_vector = func.to_tsvector(
+    text("'simple'::regconfig"), Experiment.__table__.c.description
+)
+Index(
+    "ix_experiment_description_search", experiment_search_vector, postgresql_using="gin"
+).ddl_if(dialect="postgresql")
+
+# On SQLite, an FTS5 index of the descriptions (an external content table reading them from
+# `experiment`), kept in sync by triggers
+experiment_search = table("experiment_search", column("rowid", Integer), column("description", String))
+
+for statement in (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS experiment_search "
+    "USING fts5(description, content='experiment', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS experiment_search_insert AFTER INSERT ON experiment BEGIN "
+    "INSERT INTO experiment_search (rowid, description) VALUES (new.id, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS experiment_search_delete AFTER DELETE ON experiment BEGIN "
+    "INSERT INTO experiment_search (experiment_search, rowid, description) "
+    "VALUES ('delete', old.id, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS experiment_search_update AFTER UPDATE OF description ON experiment BEGIN "
+    "INSERT INTO experiment_search (experiment_search, rowid, description) "
+    "VALUES ('delete', old.id, old.description); "
+    "INSERT INTO experiment_search (rowid, description) VALUES (new.id, new.description); END",
+    # Index the experiments of databases created before the search table
+    "INSERT INTO experiment_search (experiment_search) VALUES ('rebuild')",
+):
+    event.listen(Base.metadata, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(
+    Base.metadata,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS experiment_search").execute_if(dialect="sqlite"),
+)
+
+
 class Team(Base):
     __tablename__ = "team"
 
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(unique=True, nullable=False, index=True)
-    parent_id: Mapped[int] = mapped_column(ForeignKey("team.id"), nullable=True)
+    parent_id: Mapped[int] = mapped_column(ForeignKey("team.id"), nullable=True, index=True)
 
     children = relationship("Team", back_populates="parent")
     parent = relationship("Team", back_populates="children", remote_side=[id])
@@ -40,9 +104,23 @@ class Team(Base):
     )
 
     def is_descendant_of(self, team: Team) -> bool:
-        if self.parent_id == team.id:
-            return True
-        elif self.parent_id is None:
-            return False
-        else:
-            return self.parent.is_descendant_of(team)
+        return object_session(self).scalar(
+            select(
+                exists().where(
+                    team_closure.c.ancestor_id == team.id,
+                    team_closure.c.descendant_id == self.id,
+                    team_closure.c.depth > 0,
+                )
+            )
+        )
+
+
+class VersionCounter(Base):
+    """
+    Monotonic counters bumped by write paths, used to detect changes made by other workers.
+    """
+
+    __tablename__ = "version_counter"
+
+    name: Mapped[str] = mapped_column(primary_key=True)
+    value: Mapped[int] = mapped_column(nullable=False, default=0)
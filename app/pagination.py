@@ -0,0 +1,52 @@
+import base64
+import binascii
+import json
+
+from .exceptions import InvalidCursorError
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(position: dict) -> str:
+    """
+    Encode the keyset position of the last returned row as an opaque cursor.
+    """
+    payload = json.dumps(position, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, keys: tuple[str, ...] = ()) -> dict:
+    """
+    Decode a cursor produced by `encode_cursor`, rejecting anything malformed, including
+    cursors without a number for each of the `keys` the rows are sorted by besides the ID.
+    """
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(cursor + padding))
+    except (binascii.Error, ValueError):
+        raise InvalidCursorError()
+
+    if not isinstance(position, dict) or not isinstance(position.get("id"), int):
+        raise InvalidCursorError()
+
+    for key in keys:
+        if not isinstance(position.get(key), (int, float)) or isinstance(position[key], bool):
+            raise InvalidCursorError()
+
+    return position
+
+
+def paginate(items: list, limit: int, keys: tuple[str, ...] = ()) -> tuple[list, str | None]:
+    """
+    Trim a list (of objects or dicts) fetched with `limit + 1` rows down to a page and compute
+    the cursor pointing past its last row (None if there are no more rows), from its ID and the
+    `keys` the rows are sorted by besides the ID.
+    """
+    if len(items) <= limit:
+        return items, None
+
+    page = items[:limit]
+    last = page[-1]
+    get = last.get if isinstance(last, dict) else lambda key: getattr(last, key)
+    return page, encode_cursor({key: get(key) for key in (*keys, "id")})
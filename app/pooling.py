@@ -0,0 +1,93 @@
+"""
+Connection pool configuration and instrumentation.
+
+The pool is configured with the following environment variables:
+
+- DB_POOL_MODE: `queue` (default) for a regular pool, or `null` to open a connection per
+checkout, for use behind a transaction-pooling pgbouncer
+- DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING: the
+corresponding `create_engine` arguments
+"""
+
+import os
+import time
+
+from sqlalchemy import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, Pool, QueuePool
+
+from .metrics import Histogram
+
+# Instrumented pools and the time spent waiting for one of their connections, by pool name
+POOLS: dict[str, Pool] = {}
+POOL_WAIT_TIME: dict[str, Histogram] = {}
+
+
+class _WaitTimingMixin:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        POOLS[self._orig_logging_name] = self
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            wait_time = POOL_WAIT_TIME.setdefault(self._orig_logging_name, Histogram())
+            wait_time.observe(time.perf_counter() - start)
+
+
+class InstrumentedQueuePool(_WaitTimingMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(_WaitTimingMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+class InstrumentedNullPool(_WaitTimingMixin, NullPool):
+    pass
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).lower() in ("1", "true", "yes")
+
+
+def get_pool_options(name: str, is_async: bool = False) -> dict:
+    """
+    `create_engine` arguments configuring the pool from the environment. `name` identifies
+    the pool in the statistics and metrics, so it must be unique among the engines (e.g.
+    `primary` and `primary_async`).
+    """
+    options = {
+        "pool_logging_name": name,
+        "pool_pre_ping": _env_bool("DB_POOL_PRE_PING", False),
+    }
+
+    if os.getenv("DB_POOL_MODE", "queue") == "null":
+        options["poolclass"] = InstrumentedNullPool
+        if is_async:
+            # Prepared statements do not survive transaction pooling
+            options["connect_args"] = {"statement_cache_size": 0, "prepared_statement_cache_size": 0}
+        return options
+
+    options["poolclass"] = InstrumentedAsyncAdaptedQueuePool if is_async else InstrumentedQueuePool
+    options["pool_size"] = int(os.getenv("DB_POOL_SIZE", "5"))
+    options["max_overflow"] = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    options["pool_timeout"] = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    options["pool_recycle"] = int(os.getenv("DB_POOL_RECYCLE", "-1"))
+    return options
+
+
+def get_pool_stats(engine: Engine) -> dict:
+    pool = engine.pool
+    stats = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+        )
+    wait_time = POOL_WAIT_TIME.get(pool._orig_logging_name)
+    stats["wait_time"] = wait_time.snapshot() if wait_time is not None else Histogram().snapshot()
+    return stats
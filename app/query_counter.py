@@ -0,0 +1,31 @@
+from sqlalchemy import event
+
+
+class QueryCounter:
+    """
+    Context manager counting the SQL statements executed through an engine or a connection.
+
+    Usage:
+
+        with QueryCounter(engine) as counter:
+            ...
+        assert counter.count == 2
+    """
+
+    def __init__(self, bind):
+        self.bind = bind
+        self.statements: list[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        event.listen(self.bind, "before_cursor_execute", self._before_cursor_execute)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.bind, "before_cursor_execute", self._before_cursor_execute)
@@ -0,0 +1,63 @@
+"""
+Read-your-writes routing for the read replica.
+
+The GET routes read from the replica when one is configured (see `database.get_read_db`). As the
+replica lags behind the primary, a client is routed to the primary for a short window after each
+of its writes, so that it reads its own writes: `ReadYourWritesMiddleware` sets a cookie holding
+the end of that window on the response to every successful write.
+
+The window is configured with the READ_YOUR_WRITES_WINDOW environment variable, in seconds
+(5 by default), which should exceed the usual replication lag.
+"""
+
+import os
+import time
+from http.cookies import SimpleCookie
+
+from fastapi import Request
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+READ_YOUR_WRITES_WINDOW = float(os.getenv("READ_YOUR_WRITES_WINDOW", "5"))
+
+# Holds the time (in seconds since the epoch) until which the client reads from the primary
+READ_PRIMARY_COOKIE = "read_primary_until"
+
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def reads_own_writes(request: Request) -> bool:
+    """
+    Whether the client wrote recently enough to have to read from the primary.
+    """
+    try:
+        return float(request.cookies.get(READ_PRIMARY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+class ReadYourWritesMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] in READ_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message: Message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                cookie = SimpleCookie()
+                cookie[READ_PRIMARY_COOKIE] = str(time.time() + READ_YOUR_WRITES_WINDOW)
+                cookie[READ_PRIMARY_COOKIE].update(
+                    {
+                        "max-age": str(int(READ_YOUR_WRITES_WINDOW) + 1),
+                        "path": "/",
+                        "httponly": True,
+                        "samesite": "lax",
+                    }
+                )
+                MutableHeaders(scope=message).append("set-cookie", cookie.output(header="").strip())
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
@@ -0,0 +1,511 @@
+"""
+The routes of the API, defined once for both applications: `main` mounts them on `crud` run in
+the threadpool (see `threaded_crud`) and `async_main` on `async_crud`.
+"""
+
+from types import ModuleType
+
+import orjson
+from fastapi import APIRouter, Depends, Header, Query, Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
+
+from . import schemas
+from .cache import experiments_cache
+from .etags import etag_matches, make_etag, not_modified
+from .exceptions import TeamNotFoundError, ExperimentNotFoundError
+from .fieldsets import (
+    EXPERIMENT_FIELDS,
+    EXPERIMENT_RELATIONSHIPS,
+    TEAM_FIELDS,
+    TEAM_RELATIONSHIPS,
+    parse_fieldset,
+)
+from .metrics import CONTENT_TYPE_LATEST, REGISTRY
+from .pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, paginate
+from .replication import reads_own_writes
+from .serialization import dump_tree
+
+# Number of experiments sent to the client at once by the export endpoint
+EXPORT_CHUNK_SIZE = 100
+
+
+def create_router(crud: ModuleType, get_db, get_read_db) -> APIRouter:
+    """
+    Create the routes of the API on top of a module of awaitable `crud` functions (`async_crud`
+    or `threaded_crud`), with `get_db` providing the sessions of the writes and `get_read_db`
+    those of the reads.
+    """
+    router = APIRouter()
+
+    @router.get(
+        "/experiments/",
+        response_model=list[schemas.SparseExperiment],
+        responses={304: {"description": "Not Modified"}},
+    )
+    async def read_experiments(
+        team: str | None = None,
+        include_descendants: bool = False,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: str | None = None,
+        fields: str | None = None,
+        expand: str | None = None,
+        min_sample_ratio: float | None = None,
+        max_sample_ratio: float | None = None,
+        sort: schemas.ExperimentSort = "id",
+        if_none_match: str | None = Header(None),
+        db=Depends(get_read_db),
+    ):
+        """
+        Get a page of experiments, ordered by ID unless sorted otherwise. Optionally, provide the following query parameters:
+
+        - **team**: the name of the team to filter by
+        - **include_descendants**: whether to include the descendants of the team or not
+        - **limit**: the maximum number of experiments to return
+        - **cursor**: the cursor returned in the `X-Next-Cursor` header of the previous page
+        - **fields**: the comma-separated fields to return, out of `description` and `sample_ratio` (the `id` and the sort key are always returned)
+        - **expand**: the comma-separated relationships to return, out of `teams` (none if empty)
+        - **min_sample_ratio**: the minimum sample ratio of the experiments (inclusive)
+        - **max_sample_ratio**: the maximum sample ratio of the experiments (inclusive)
+        - **sort**: the order of the experiments, `id` (default) or `sample_ratio`, descending if prefixed with `-`
+
+        If there are more experiments, the cursor of the next page is returned in the `X-Next-Cursor` header.
+
+        The response has an `ETag` which changes with any write. Requests with a matching
+        `If-None-Match` header get a `304 Not Modified` response without querying the experiments.
+        Pages are also cached until the next write.
+        """
+        sort_keys = ("sample_ratio",) if sort.lstrip("-") == "sample_ratio" else ()
+        position = decode_cursor(cursor, keys=sort_keys) if cursor else {}
+        fieldset = parse_fieldset(fields, EXPERIMENT_FIELDS, "fields")
+        expansions = parse_fieldset(expand, EXPERIMENT_RELATIONSHIPS, "expand")
+
+        def page_key(etag: str) -> tuple:
+            return (
+                team,
+                include_descendants,
+                limit,
+                cursor,
+                fieldset,
+                expansions,
+                min_sample_ratio,
+                max_sample_ratio,
+                sort,
+                # Pages built from older data (before a write made by another process, or read
+                # from a lagging replica) are never served once the data version moved on
+                etag,
+            )
+
+        cached = generation = None
+
+        def is_current(version: int) -> bool:
+            # Called between the queries of the data version and of the rows
+            nonlocal cached, generation
+            etag = make_etag(version)
+            if etag_matches(if_none_match, etag):
+                return True
+            generation = experiments_cache.generation
+            cached = experiments_cache.get(page_key(etag))
+            return cached is not None
+
+        # Rows come straight from the database in the shape of the response model, so they
+        # are serialized without being validated against it
+        version, experiments = await crud.get_versioned_experiment_rows(
+            db,
+            is_current,
+            team=team,
+            include_descendants=include_descendants,
+            limit=limit + 1,
+            after_id=position.get("id"),
+            fields=fieldset,
+            expand=expansions,
+            min_sample_ratio=min_sample_ratio,
+            max_sample_ratio=max_sample_ratio,
+            sort=sort,
+            after_sample_ratio=position.get("sample_ratio"),
+        )
+        etag = make_etag(version)
+        if experiments is None:
+            return cached.to_response() if cached is not None else not_modified(etag)
+
+        experiments, next_cursor = paginate(experiments, limit, keys=sort_keys)
+        headers = {"ETag": etag}
+        if next_cursor is not None:
+            headers["X-Next-Cursor"] = next_cursor
+        content = orjson.dumps(experiments)
+        experiments_cache.set(page_key(etag), content, headers, generation)
+        return Response(content, media_type="application/json", headers=headers)
+
+    @router.get("/experiments/export", response_class=StreamingResponse)
+    async def export_experiments(
+        request: Request,
+        team: str | None = None,
+        include_descendants: bool = False,
+    ):
+        """
+        Export all the experiments with their teams as newline-delimited JSON (one experiment per
+        line). The experiments are streamed from the database, so the export can be arbitrarily
+        large. Optionally, provide the following query parameters:
+
+        - **team**: the name of the team to filter by
+        - **include_descendants**: whether to include the descendants of the team or not
+        """
+
+        primary = reads_own_writes(request)
+
+        # The body is streamed after the dependencies are torn down, so it reads through a
+        # session of its own
+        async def generate_lines():
+            async with crud.open_read_session(primary=primary) as db:
+                lines = []
+                async for experiment in crud.export_experiments(
+                    db, team=team, include_descendants=include_descendants
+                ):
+                    lines.append(orjson.dumps(experiment, option=orjson.OPT_APPEND_NEWLINE))
+                    if len(lines) == EXPORT_CHUNK_SIZE:
+                        yield b"".join(lines)
+                        lines = []
+                yield b"".join(lines)
+
+        return StreamingResponse(generate_lines(), media_type="application/x-ndjson")
+
+    @router.get("/experiments/search", response_model=list[schemas.SparseExperimentSearchResult])
+    async def search_experiments(
+        q: str = Query(min_length=1),
+        team: str | None = None,
+        include_descendants: bool = False,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: str | None = None,
+        fields: str | None = None,
+        expand: str | None = None,
+        db=Depends(get_read_db),
+    ):
+        """
+        Search the experiments by description, best matches first. Every word of the query must
+        start a word of the description. Optionally, provide the following query parameters:
+
+        - **team**: the name of the team to filter by
+        - **include_descendants**: whether to include the descendants of the team or not
+        - **limit**: the maximum number of experiments to return
+        - **cursor**: the cursor returned in the `X-Next-Cursor` header of the previous page
+        - **fields**: the comma-separated fields to return, out of `description` and `sample_ratio` (the `id` and `rank` are always returned)
+        - **expand**: the comma-separated relationships to return, out of `teams` (none if empty)
+
+        If there are more experiments, the cursor of the next page is returned in the `X-Next-Cursor` header.
+        """
+        position = decode_cursor(cursor, keys=("rank",)) if cursor else None
+        fieldset = parse_fieldset(fields, EXPERIMENT_FIELDS, "fields")
+        expansions = parse_fieldset(expand, EXPERIMENT_RELATIONSHIPS, "expand")
+        experiments = await crud.search_experiment_rows(
+            db,
+            q,
+            team=team,
+            include_descendants=include_descendants,
+            limit=limit + 1,
+            after=(position["rank"], position["id"]) if position else None,
+            fields=fieldset,
+            expand=expansions,
+        )
+        experiments, next_cursor = paginate(experiments, limit, keys=("rank",))
+        headers = {}
+        if next_cursor is not None:
+            headers["X-Next-Cursor"] = next_cursor
+        return Response(orjson.dumps(experiments), media_type="application/json", headers=headers)
+
+    @router.get("/experiments/{experiment_id}", response_model=schemas.SparseExperiment)
+    async def read_experiment(
+        experiment_id: int,
+        fields: str | None = None,
+        expand: str | None = None,
+        db=Depends(get_read_db),
+    ):
+        """
+        Get an experiment by its ID. Optionally, provide the following query parameters:
+
+        - **fields**: the comma-separated fields to return, out of `description` and `sample_ratio` (the `id` is always returned)
+        - **expand**: the comma-separated relationships to return, out of `teams` (none if empty)
+        """
+        experiment = await crud.get_experiment_row(
+            db,
+            experiment_id=experiment_id,
+            fields=parse_fieldset(fields, EXPERIMENT_FIELDS, "fields"),
+            expand=parse_fieldset(expand, EXPERIMENT_RELATIONSHIPS, "expand"),
+        )
+        if experiment is None:
+            raise ExperimentNotFoundError()
+        return Response(orjson.dumps(experiment), media_type="application/json")
+
+    @router.post("/experiments/", status_code=201, response_model=schemas.Experiment)
+    async def create_experiment(experiment: schemas.ExperimentCreate, db=Depends(get_db)):
+        """
+        Create an experiment with all the information:
+
+        - **description**: a description of the experiment
+        - **sample_ratio**: the ratio of the sample
+        - **teams**: a list of teams assigned to the experiment (their names)
+
+        There are several constraints related to the teams:
+        - the number of teams must be between 1 and 2
+        - the teams must not be descendants of each other
+        - each team can be assigned to an experiment only once
+        """
+        return await crud.create_experiment(db=db, experiment=experiment)
+
+    @router.post(
+        "/experiments/bulk", status_code=201, response_model=list[schemas.ExperimentBulkResult]
+    )
+    async def create_experiments(
+        experiments: list[schemas.ExperimentCreate],
+        atomic: bool = True,
+        db=Depends(get_db),
+    ):
+        """
+        Create many experiments in a single transaction. Each experiment takes the same
+        information, and is subject to the same team constraints, as during a single creation.
+
+        - **atomic**: if true (the default), no experiment is created if any of them is invalid
+        and the errors are returned with status 400. If false, the valid experiments are created
+        and the result of each experiment (the experiment or the error) is returned in order
+        """
+        return await crud.create_experiments(db=db, experiments=experiments, atomic=atomic)
+
+    @router.put("/experiments/{experiment_id}/", response_model=schemas.Experiment)
+    async def update_experiment(
+        experiment_id: int,
+        experiment: schemas.ExperimentUpdate,
+        db=Depends(get_db),
+    ):
+        """
+        Update an experiment by passing its ID. You can update the following fields:
+
+        - **description**: a description of the experiment
+        - **sample_ratio**: the ratio of the sample
+        """
+        return await crud.update_experiment(
+            db=db, experiment=experiment, experiment_id=experiment_id
+        )
+
+    @router.patch(
+        "/experiments/{experiment_id}/reassign_teams/", response_model=schemas.Experiment
+    )
+    async def reassign_experiment_teams(
+        experiment_id: int,
+        experiment: schemas.ExperimentReassignTeams,
+        db=Depends(get_db),
+    ):
+        """
+        Reassign the teams of an experiment by passing its ID. You can update the following fields:
+
+        - **teams**: a list of teams assigned to the experiment (their names)
+
+        There are several constraints related to the teams, the same as during the creation of an experiment:
+        - the number of teams must be between 1 and 2
+        - the teams must not be descendants of each other
+        - each team can be assigned to an experiment only once
+        """
+        return await crud.reassign_experiment_teams(
+            db=db, experiment=experiment, experiment_id=experiment_id
+        )
+
+    @router.delete("/experiments/{experiment_id}/", status_code=204)
+    async def delete_experiment(experiment_id: int, db=Depends(get_db)):
+        """
+        Delete an experiment by passing its ID.
+        """
+        return await crud.delete_experiment(db=db, experiment_id=experiment_id)
+
+    @router.get(
+        "/teams/",
+        response_model=list[schemas.SparseTeam],
+        responses={304: {"description": "Not Modified"}},
+    )
+    async def read_teams(
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: str | None = None,
+        fields: str | None = None,
+        expand: str | None = None,
+        if_none_match: str | None = Header(None),
+        db=Depends(get_read_db),
+    ):
+        """
+        Get a page of teams ordered by ID. Optionally, provide the following query parameters:
+
+        - **limit**: the maximum number of teams to return
+        - **cursor**: the cursor returned in the `X-Next-Cursor` header of the previous page
+        - **fields**: the comma-separated fields to return, out of `name` and `parent_id` (the `id` is always returned)
+        - **expand**: the comma-separated relationships to return, out of `children` and `experiments` (none if empty)
+
+        If there are more teams, the cursor of the next page is returned in the `X-Next-Cursor` header.
+
+        The response has an `ETag` which changes with any write. Requests with a matching
+        `If-None-Match` header get a `304 Not Modified` response without querying the teams.
+        """
+        after_id = decode_cursor(cursor)["id"] if cursor else None
+        fieldset = parse_fieldset(fields, TEAM_FIELDS, "fields")
+        expansions = parse_fieldset(expand, TEAM_RELATIONSHIPS, "expand")
+        version, teams = await crud.get_versioned_team_rows(
+            db,
+            lambda version: etag_matches(if_none_match, make_etag(version)),
+            limit=limit + 1,
+            after_id=after_id,
+            fields=fieldset,
+            expand=expansions,
+        )
+        etag = make_etag(version)
+        if teams is None:
+            return not_modified(etag)
+        teams, next_cursor = paginate(teams, limit)
+        headers = {"ETag": etag}
+        if next_cursor is not None:
+            headers["X-Next-Cursor"] = next_cursor
+        return Response(orjson.dumps(teams), media_type="application/json", headers=headers)
+
+    @router.get("/teams/{team_name}", response_model=schemas.SparseTeam)
+    async def read_team(
+        team_name: str,
+        fields: str | None = None,
+        expand: str | None = None,
+        db=Depends(get_read_db),
+    ):
+        """
+        Get a team by its name. Optionally, provide the following query parameters:
+
+        - **fields**: the comma-separated fields to return, out of `name` and `parent_id` (the `id` is always returned)
+        - **expand**: the comma-separated relationships to return, out of `children` and `experiments` (none if empty)
+        """
+        team = await crud.get_team_row(
+            db,
+            team_name=team_name,
+            fields=parse_fieldset(fields, TEAM_FIELDS, "fields"),
+            expand=parse_fieldset(expand, TEAM_RELATIONSHIPS, "expand"),
+        )
+        if team is None:
+            raise TeamNotFoundError()
+        return Response(orjson.dumps(team), media_type="application/json")
+
+    @router.get("/teams/{team_name}/tree", response_model=schemas.TeamTree)
+    async def read_team_tree(
+        team_name: str,
+        max_depth: int | None = Query(None, ge=0),
+        with_experiment_counts: bool = False,
+        db=Depends(get_read_db),
+    ):
+        """
+        Get the whole hierarchy below a team, as nested teams. Optionally, provide the following query parameters:
+
+        - **max_depth**: the number of levels below the team to return (all by default)
+        - **with_experiment_counts**: whether to include the number of experiments assigned to each team
+        """
+        tree = await crud.get_team_tree(
+            db,
+            team_name=team_name,
+            max_depth=max_depth,
+            with_experiment_counts=with_experiment_counts,
+        )
+        if tree is None:
+            raise TeamNotFoundError()
+        return Response(dump_tree(tree), media_type="application/json")
+
+    @router.get("/teams/{team_name}/ancestors", response_model=list[schemas.TeamAncestor])
+    async def read_team_ancestors(team_name: str, db=Depends(get_read_db)):
+        """
+        Get the ancestors of a team, from its parent up to the root, with their distance (`depth`) to the team.
+        """
+        ancestors = await crud.get_team_ancestors(db, team_name=team_name)
+        if ancestors is None:
+            raise TeamNotFoundError()
+        return ancestors
+
+    @router.post("/teams/ancestry", response_model=list[schemas.AncestryResult])
+    async def check_ancestry(pairs: list[schemas.AncestryCheck], db=Depends(get_db)):
+        """
+        Check, for many pairs of teams at once, whether `ancestor` is an ancestor of `descendant`.
+        The result (`is_ancestor`) is null for pairs with a team which does not exist.
+        """
+        results = await crud.check_ancestry(db, pairs=pairs)
+        return [
+            {"ancestor": pair.ancestor, "descendant": pair.descendant, "is_ancestor": is_ancestor}
+            for pair, is_ancestor in zip(pairs, results)
+        ]
+
+    @router.post("/teams/", status_code=201, response_model=schemas.Team)
+    async def create_team(team: schemas.TeamCreate, db=Depends(get_db)):
+        """
+        Create a team with the following information:
+
+        - **name**: the name of the team
+        - **parent_id**: the ID of the parent team (if any)
+        """
+        return await crud.create_team(db=db, team=team)
+
+    @router.post("/teams/bulk", status_code=201, response_model=list[schemas.TeamImported])
+    async def import_teams(teams: list[schemas.TeamImport], db=Depends(get_db)):
+        """
+        Create a whole hierarchy of teams at once. Each team takes the following information:
+
+        - **name**: the name of the team
+        - **parent**: the name of the parent team (if any), either one of the imported teams or
+        an existing team
+
+        The teams can be given in any order. The names must be unique, and the hierarchy must not
+        contain cycles.
+        """
+        return await crud.import_teams(db=db, teams=teams)
+
+    @router.put("/teams/{team_name}/", response_model=schemas.Team)
+    async def update_team(team_name: str, team: schemas.TeamUpdate, db=Depends(get_db)):
+        """
+        Update a team by passing its name. You can update the following fields:
+
+        - **name**: the name of the team
+        - **parent_id**: the ID of the parent team (if any)
+        """
+        return await crud.update_team(db=db, team=team, team_name=team_name)
+
+    @router.delete("/teams/{team_name}/", status_code=204)
+    async def delete_team(team_name: str, db=Depends(get_db)):
+        """
+        Delete a team by passing its name.
+        """
+        return await crud.delete_team(db=db, team_name=team_name)
+
+    @router.get("/stats/teams", response_model=list[schemas.TeamStats])
+    async def read_team_stats(
+        response: Response,
+        team: str | None = None,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: str | None = None,
+        db=Depends(get_read_db),
+    ):
+        """
+        Get a page of teams ordered by ID, with the number of experiments assigned to each team and
+        their average sample ratio, both directly and over the team's whole subtree. Optionally,
+        provide the following query parameters:
+
+        - **team**: the name of the only team to return
+        - **limit**: the maximum number of teams to return
+        - **cursor**: the cursor returned in the `X-Next-Cursor` header of the previous page
+
+        If there are more teams, the cursor of the next page is returned in the `X-Next-Cursor` header.
+        """
+        after_id = decode_cursor(cursor)["id"] if cursor else None
+        stats = await crud.get_team_stats(db, team=team, limit=limit + 1, after_id=after_id)
+        stats, next_cursor = paginate(stats, limit)
+        if next_cursor is not None:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return stats
+
+    @router.get("/cache/stats", include_in_schema=False)
+    async def read_cache_stats():
+        """
+        Get the statistics of the response cache.
+        """
+        return experiments_cache.stats()
+
+    @router.get("/metrics", include_in_schema=False)
+    async def read_metrics():
+        """
+        Get the request, database and connection pool metrics in the Prometheus text format.
+        """
+        return PlainTextResponse(REGISTRY.generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+    return router
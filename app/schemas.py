@@ -1,5 +1,10 @@
+from typing import Literal
+
 from pydantic import BaseModel
 
+# Orders of the experiment listings, descending with a leading "-"
+ExperimentSort = Literal["id", "-id", "sample_ratio", "-sample_ratio"]
+
 
 class TeamBase(BaseModel):
     name: str
@@ -14,6 +19,10 @@ class TeamCreate(TeamBase):
     parent_id: int | None = None
 
 
+class TeamImport(TeamBase):
+    parent: str | None = None
+
+
 class ExperimentCreate(ExperimentBase):
     teams: list[TeamBase]
 
@@ -34,6 +43,11 @@ class TeamChild(TeamBase):
     id: int
 
 
+class TeamImported(TeamBase):
+    id: int
+    parent_id: int | None = None
+
+
 class Team(TeamBase):
     id: int
     parent_id: int | None = None
@@ -44,9 +58,112 @@ class Team(TeamBase):
         from_attributes = True
 
 
+class SparseTeam(BaseModel):
+    """
+    A team with the fields and relationships of a sparse fieldset (see `fieldsets`), of which
+    only the `id` is always returned.
+    """
+
+    id: int
+    name: str | None = None
+    parent_id: int | None = None
+    children: list[TeamChild] | None = None
+    experiments: list[ExperimentBase] | None = None
+
+
+class TeamTree(TeamBase):
+    id: int
+    experiment_count: int | None = None
+    children: list["TeamTree"] = []
+
+
+class TeamAncestor(TeamBase):
+    id: int
+    depth: int
+
+
+class AncestryCheck(BaseModel):
+    ancestor: str
+    descendant: str
+
+
+class AncestryResult(AncestryCheck):
+    is_ancestor: bool | None = None
+
+
+class TeamStats(TeamBase):
+    id: int
+    experiment_count: int
+    avg_sample_ratio: float | None = None
+    subtree_experiment_count: int
+    subtree_avg_sample_ratio: float | None = None
+
+
 class Experiment(ExperimentBase):
     id: int
     teams: list[TeamBase] = []
 
     class Config:
         from_attributes = True
+
+
+class ExperimentSearchResult(Experiment):
+    rank: float
+
+
+class SparseExperiment(BaseModel):
+    """
+    An experiment with the fields and relationships of a sparse fieldset (see `fieldsets`), of
+    which only the `id` (and the sort key of the listing) is always returned.
+    """
+
+    id: int
+    description: str | None = None
+    sample_ratio: float | None = None
+    teams: list[TeamBase] | None = None
+
+
+class SparseExperimentSearchResult(SparseExperiment):
+    rank: float
+
+
+class ExperimentBulkResult(BaseModel):
+    index: int
+    experiment: Experiment | None = None
+    error: str | None = None
+
+
+def to_schema(schema: type[BaseModel], value):
+    """
+    Validate an ORM object, or a list of them, against a schema. Relationships are loaded as
+    the schema reads them, so this runs where the session can load them.
+    """
+    if value is None:
+        return None
+    if isinstance(value, list):
+        return [schema.model_validate(item, from_attributes=True) for item in value]
+    return schema.model_validate(value, from_attributes=True)
+
+
+def to_bulk_results(results: list[tuple]) -> list[ExperimentBulkResult]:
+    """
+    Convert the `(experiment, error)` results of `crud.create_experiments`.
+    """
+    return [
+        ExperimentBulkResult(
+            index=index,
+            experiment=to_schema(Experiment, experiment),
+            error=error.detail if error is not None else None,
+        )
+        for index, (experiment, error) in enumerate(results)
+    ]
+
+
+def to_imported_teams(created: list[tuple[str, int, int | None]]) -> list[TeamImported]:
+    """
+    Convert the `(name, id, parent_id)` results of `crud.import_teams`.
+    """
+    return [
+        TeamImported(name=name, id=team_id, parent_id=parent_id)
+        for name, team_id, parent_id in created
+    ]
@@ -0,0 +1,41 @@
+"""
+Full-text search over the experiment descriptions, with a GIN-indexed text search vector on
+PostgreSQL and an FTS5 table on SQLite (see `models`).
+
+Queries are split into words, every one of which must start a word of the description, so that
+results show up while the query is being typed. Matches are ranked by relevance (`ts_rank` on
+PostgreSQL, `bm25` on SQLite), higher ranks first.
+"""
+
+import re
+
+from sqlalchemy import Select, func, select, text
+
+from .models import Experiment, experiment_search, experiment_search_vector
+
+
+def search_terms(query: str) -> list[str]:
+    """
+    The words of a search query, lowercased, without punctuation or operators.
+    """
+    return re.findall(r"[^\W_]+", query.lower())
+
+
+def ranked_matches(dialect: str, terms: list[str]) -> Select:
+    """
+    Select the IDs of the experiments whose description matches all the terms (as prefixes),
+    with their `rank`.
+    """
+    if dialect == "postgresql":
+        query = func.to_tsquery(
+            text("'simple'::regconfig"), " & ".join(f"{term}:*" for term in terms)
+        )
+        return select(
+            Experiment.id, func.ts_rank(experiment_search_vector, query).label("rank")
+        ).where(experiment_search_vector.op("@@")(query))
+
+    # bm25 scores better matches lower
+    return select(
+        experiment_search.c.rowid.label("id"),
+        (-func.bm25(text("experiment_search"))).label("rank"),
+    ).where(experiment_search.c.description.match(" ".join(f'"{term}"*' for term in terms)))
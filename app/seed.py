@@ -0,0 +1,235 @@
+"""
+Generate a synthetic dataset directly in the database, for staging and performance environments.
+
+    python -m app.seed --teams 100000 --depth 6 --fanout 8 --experiments 5000000
+
+Teams are generated as a forest of trees of the given depth and fan-out, experiments get 1 or 2
+teams which are never ancestors of each other, and the `team_closure` rows are generated
+alongside, so the data satisfies the same invariants as the data created through the API.
+Rows are streamed with `COPY FROM STDIN` on PostgreSQL and inserted in batches elsewhere.
+The data is appended to the existing one, with IDs following the current maximum.
+"""
+
+import argparse
+import logging
+import random
+import time
+from collections.abc import Iterable, Iterator
+from itertools import islice
+
+from sqlalchemy import Table, func, insert, select, text
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal
+from .models import Experiment, Team, experiment_team_association, team_closure
+from .versioning import DATA, TEAM_TREE, bump_version
+
+BATCH_SIZE = 10000
+
+
+def generate_teams(start_id: int, count: int, depth: int, fanout: int) -> Iterator[tuple[int, tuple]]:
+    """
+    Yield the IDs of `count` teams in depth-first order, each with the IDs of its ancestors
+    from the root down to its parent.
+    """
+    path, children_left = [], []
+    for team_id in range(start_id, start_id + count):
+        while children_left and children_left[-1] == 0:
+            path.pop()
+            children_left.pop()
+        if children_left:
+            children_left[-1] -= 1
+
+        yield team_id, tuple(path)
+
+        path.append(team_id)
+        children_left.append(fanout if len(path) < depth else 0)
+
+
+def generate_assignments(
+    start_id: int, count: int, team_parents: dict[int, int | None], random_seed: int
+) -> Iterator[tuple[int, int]]:
+    """
+    Yield (experiment ID, team ID) pairs assigning 1 or 2 teams to each experiment, skipping
+    the second team if it is an ancestor or a descendant of the first one.
+    """
+
+    def is_ancestor(ancestor_id: int, team_id: int) -> bool:
+        while team_id is not None:
+            if team_id == ancestor_id:
+                return True
+            team_id = team_parents.get(team_id)
+        return False
+
+    rng = random.Random(random_seed)
+    team_ids = list(team_parents)
+    for experiment_id in range(start_id, start_id + count):
+        first = rng.choice(team_ids)
+        yield experiment_id, first
+
+        if rng.random() < 0.5:
+            second = rng.choice(team_ids)
+            if not is_ancestor(first, second) and not is_ancestor(second, first):
+                yield experiment_id, second
+
+
+class _CopyStream:
+    """
+    File-like object reading rows from an iterator as COPY text format, for `copy_expert`.
+    """
+
+    def __init__(self, rows: Iterable[tuple]):
+        self._lines = (
+            "\t".join(r"\N" if value is None else str(value) for value in row) + "\n"
+            for row in rows
+        )
+        self._buffer = ""
+
+    def read(self, size: int = -1) -> str:
+        chunks = [self._buffer]
+        length = len(self._buffer)
+        while size < 0 or length < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            chunks.append(line)
+            length += len(line)
+
+        data = "".join(chunks)
+        if size < 0:
+            size = len(data)
+        self._buffer = data[size:]
+        return data[:size]
+
+
+def _batches(rows: Iterable[tuple], size: int) -> Iterator[list[tuple]]:
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+def _load(db: Session, table: Table, columns: list[str], rows: Iterable[tuple], batch_size: int):
+    if db.get_bind().dialect.name == "postgresql":
+        cursor = db.connection().connection.cursor()
+        cursor.copy_expert(f"COPY {table.name} ({', '.join(columns)}) FROM STDIN", _CopyStream(rows))
+        cursor.close()
+        return
+
+    for batch in _batches(rows, batch_size):
+        db.execute(insert(table), [dict(zip(columns, row)) for row in batch])
+
+
+def seed(
+    db: Session,
+    teams: int,
+    depth: int,
+    fanout: int,
+    experiments: int,
+    random_seed: int = 0,
+    prefix: str = "seed",
+    batch_size: int = BATCH_SIZE,
+) -> dict[str, int]:
+    """
+    Insert the synthetic teams, closure rows, experiments and assignments in one transaction.
+    Returns the number of inserted rows per table.
+    """
+    first_team_id = (db.scalar(select(func.max(Team.id))) or 0) + 1
+    first_experiment_id = (db.scalar(select(func.max(Experiment.id))) or 0) + 1
+
+    team_parents = {
+        team_id: ancestors[-1] if ancestors else None
+        for team_id, ancestors in generate_teams(first_team_id, teams, depth, fanout)
+    }
+    counts = {}
+
+    def load(table, columns, rows):
+        def counted(rows):
+            for row in rows:
+                counts[table.name] = counts.get(table.name, 0) + 1
+                yield row
+
+        started = time.perf_counter()
+        _load(db, table, columns, counted(rows), batch_size)
+        logging.info(
+            f"Inserted {counts.get(table.name, 0)} rows into {table.name} "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+
+    try:
+        load(
+            Team.__table__,
+            ["id", "name", "parent_id"],
+            ((team_id, f"{prefix}-{team_id}", parent_id) for team_id, parent_id in team_parents.items()),
+        )
+        load(
+            team_closure,
+            ["ancestor_id", "descendant_id", "depth"],
+            (
+                (ancestor_id, team_id, len(ancestors) - position)
+                for team_id, ancestors in generate_teams(first_team_id, teams, depth, fanout)
+                for position, ancestor_id in enumerate(ancestors + (team_id,))
+            ),
+        )
+
+        rng = random.Random(random_seed)
+        load(
+            Experiment.__table__,
+            ["id", "description", "sample_ratio"],
+            (
+                (experiment_id, f"{prefix} experiment {experiment_id}", round(rng.random(), 4))
+                for experiment_id in range(first_experiment_id, first_experiment_id + experiments)
+            ),
+        )
+        load(
+            experiment_team_association,
+            ["experiment_id", "team_id"],
+            generate_assignments(first_experiment_id, experiments, team_parents, random_seed),
+        )
+
+        if db.get_bind().dialect.name == "postgresql":
+            # Rows were inserted with explicit IDs, so the sequences have to catch up
+            for table in ("team", "experiment"):
+                db.execute(
+                    text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), max(id)) FROM {table}")
+                )
+
+        bump_version(db, TEAM_TREE)
+        bump_version(db, DATA)
+        db.commit()
+
+    except Exception as e:
+        logging.error(f"An error occurred while seeding the database: {e}")
+        db.rollback()
+        raise
+
+    else:
+        return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic dataset in the database.")
+    parser.add_argument("--teams", type=int, default=10000, help="number of teams")
+    parser.add_argument("--depth", type=int, default=5, help="depth of each team tree")
+    parser.add_argument("--fanout", type=int, default=5, help="number of children of each team")
+    parser.add_argument("--experiments", type=int, default=100000, help="number of experiments")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--prefix", default="seed", help="prefix of the generated team names")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="rows per INSERT (not PostgreSQL)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    with SessionLocal() as db:
+        seed(
+            db,
+            teams=args.teams,
+            depth=args.depth,
+            fanout=args.fanout,
+            experiments=args.experiments,
+            random_seed=args.seed,
+            prefix=args.prefix,
+            batch_size=args.batch_size,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+import orjson
+
+
+def dump_tree(tree: dict) -> bytes:
+    """
+    Encode nested dicts, whose nested dicts are all in a last `children` list, to JSON.
+
+    orjson refuses to encode more than 254 levels of nesting, so deeper trees are encoded
+    iteratively, node by node.
+    """
+    try:
+        return orjson.dumps(tree)
+    except orjson.JSONEncodeError:
+        pass
+
+    parts = []
+    stack: list[dict | bytes] = [tree]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, bytes):
+            parts.append(item)
+            continue
+
+        fields = {key: value for key, value in item.items() if key != "children"}
+        parts.append(orjson.dumps(fields)[:-1] + (b"," if fields else b"") + b'"children":[')
+        stack.append(b"]}")
+        for index in range(len(item["children"]) - 1, -1, -1):
+            stack.append(item["children"][index])
+            if index:
+                stack.append(b",")
+
+    return b"".join(parts)
@@ -0,0 +1,113 @@
+"""
+In-process index of the whole team forest.
+
+The index maps team names to IDs and IDs to parent IDs, and stores the enter/exit times of an
+Euler tour of the forest, so that ancestry checks are two integer comparisons instead of
+database round-trips. It is tagged with the `team_tree` version counter, which every team
+write bumps, and is rebuilt whenever the counter in the database differs from the cached one,
+which keeps multiple workers coherent. One index is kept per database, so that the primary and a
+lagging read replica do not make each other's index look outdated.
+"""
+
+import threading
+
+from sqlalchemy import select
+from sqlalchemy.engine import URL
+from sqlalchemy.orm import Session
+
+from .models import Team
+from .versioning import TEAM_TREE, get_version
+
+
+class TeamTreeIndex:
+    def __init__(self, version: int, rows: list[tuple[int, str, int | None]]):
+        self.version = version
+        self.ids: dict[str, int] = {}
+        self.parents: dict[int, int | None] = {}
+        self.names: dict[int, str] = {}
+        self._enter: dict[int, int] = {}
+        self._exit: dict[int, int] = {}
+
+        children: dict[int | None, list[int]] = {}
+        for team_id, name, parent_id in rows:
+            self.ids[name] = team_id
+            self.names[team_id] = name
+            self.parents[team_id] = parent_id
+            children.setdefault(parent_id, []).append(team_id)
+
+        roots = [
+            team_id
+            for team_id, parent_id in self.parents.items()
+            if parent_id is None or parent_id not in self.parents
+        ]
+
+        clock = 0
+        for root in roots:
+            stack = [(root, False)]
+            while stack:
+                team_id, visited = stack.pop()
+                if visited:
+                    self._exit[team_id] = clock
+                    continue
+                self._enter[team_id] = clock
+                clock += 1
+                stack.append((team_id, True))
+                stack.extend((child_id, False) for child_id in children.get(team_id, ()))
+
+    def __len__(self) -> int:
+        return len(self.parents)
+
+    def is_ancestor(self, ancestor_id: int, descendant_id: int) -> bool:
+        """
+        Whether `ancestor_id` is a strict ancestor of `descendant_id`. Unknown teams have
+        neither ancestors nor descendants.
+        """
+        if ancestor_id not in self._enter or descendant_id not in self._enter:
+            return False
+        return self._enter[ancestor_id] < self._enter[descendant_id] < self._exit[ancestor_id]
+
+    def ancestors(self, team_id: int) -> list[int]:
+        """
+        IDs of the strict ancestors of a team, from its parent up to the root.
+        """
+        ancestors = []
+        parent_id = self.parents.get(team_id)
+        while parent_id is not None and parent_id in self.parents:
+            ancestors.append(parent_id)
+            parent_id = self.parents[parent_id]
+        return ancestors
+
+
+# Indexes by database URL
+_indexes: dict[URL, TeamTreeIndex] = {}
+_lock = threading.Lock()
+
+
+def get_team_index(db: Session) -> TeamTreeIndex:
+    """
+    Return the cached index of the session's database, rebuilding it first if the team tree
+    changed since it was built.
+    """
+    bind = db.get_bind()
+    url = getattr(bind, "engine", bind).url
+
+    version = get_version(db, TEAM_TREE)
+    index = _indexes.get(url)
+    if index is not None and index.version == version:
+        return index
+
+    # The rows are loaded without holding the lock: under `AsyncSession.run_sync` the query yields
+    # to the event loop, whose thread would block on the lock if another coroutine held it.
+    # Concurrent rebuilds of the same version build identical indexes, so the first one stored wins.
+    rebuilt = TeamTreeIndex(version, db.execute(select(Team.id, Team.name, Team.parent_id)).all())
+
+    with _lock:
+        index = _indexes.get(url)
+        if index is None or index.version != version:
+            index = _indexes[url] = rebuilt
+
+    return index
+
+
+def invalidate_team_index():
+    _indexes.clear()
@@ -0,0 +1,81 @@
+"""
+Awaitable versions of the functions in `crud` used by the routes (see `routes`), for the sync
+application in `main`.
+
+Each function runs its `crud` counterpart on a sync `Session` in the threadpool, in a single
+trip, and converts the results to schemas like `async_crud` before leaving the thread, as lazy
+loads are only possible there.
+"""
+
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
+from itertools import islice
+
+from sqlalchemy.orm import Session
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+
+from . import crud, database, schemas
+
+
+def _threaded(function: Callable, convert: Callable | None = None):
+    def call(db: Session, *args, **kwargs):
+        result = function(db, *args, **kwargs)
+        return result if convert is None else convert(result)
+
+    async def threaded(db: Session, *args, **kwargs):
+        return await run_in_threadpool(call, db, *args, **kwargs)
+
+    return threaded
+
+
+def _to_experiment(experiment) -> schemas.Experiment | None:
+    return schemas.to_schema(schemas.Experiment, experiment)
+
+
+def _to_team(team) -> schemas.Team | None:
+    return schemas.to_schema(schemas.Team, team)
+
+
+get_versioned_experiment_rows = _threaded(crud.get_versioned_experiment_rows)
+get_experiment_row = _threaded(crud.get_experiment_row)
+search_experiment_rows = _threaded(crud.search_experiment_rows)
+create_experiment = _threaded(crud.create_experiment, _to_experiment)
+create_experiments = _threaded(crud.create_experiments, schemas.to_bulk_results)
+update_experiment = _threaded(crud.update_experiment, _to_experiment)
+reassign_experiment_teams = _threaded(crud.reassign_experiment_teams, _to_experiment)
+delete_experiment = _threaded(crud.delete_experiment)
+get_versioned_team_rows = _threaded(crud.get_versioned_team_rows)
+get_team_row = _threaded(crud.get_team_row)
+get_team_tree = _threaded(crud.get_team_tree)
+get_team_ancestors = _threaded(crud.get_team_ancestors)
+check_ancestry = _threaded(crud.check_ancestry)
+get_team_stats = _threaded(crud.get_team_stats)
+create_team = _threaded(crud.create_team, _to_team)
+import_teams = _threaded(crud.import_teams, schemas.to_imported_teams)
+update_team = _threaded(crud.update_team, _to_team)
+delete_team = _threaded(crud.delete_team)
+
+
+async def export_experiments(
+    db: Session,
+    team: str | None = None,
+    include_descendants: bool = False,
+    batch_size: int = 1000,
+) -> AsyncIterator[dict]:
+    experiments = crud.export_experiments(
+        db, team=team, include_descendants=include_descendants, batch_size=batch_size
+    )
+    # One trip to the threadpool per batch of experiments, rather than per experiment
+    batches = iter(lambda: list(islice(experiments, batch_size)), [])
+    async for batch in iterate_in_threadpool(batches):
+        for experiment in batch:
+            yield experiment
+
+
+@asynccontextmanager
+async def open_read_session(primary: bool = False) -> AsyncIterator[Session]:
+    db = database.open_read_session(primary)
+    try:
+        yield db
+    finally:
+        await run_in_threadpool(db.close)
@@ -0,0 +1,31 @@
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+
+from .models import VersionCounter
+
+TEAM_TREE = "team_tree"
+# Bumped by every write, to tell whether any data changed (e.g. for ETags)
+DATA = "data"
+
+
+def get_version(db: Session, name: str) -> int:
+    return db.scalar(select(VersionCounter.value).where(VersionCounter.name == name)) or 0
+
+
+def bump_version(db: Session, name: str):
+    """
+    Increment a version counter as part of the current transaction.
+
+    The UPDATE locks the counter's row until the end of the transaction, so writers bumping
+    the same counter (every writer, for `DATA`) are serialized from this point on. The pending
+    changes of the session are flushed first, and callers bump the counters right before
+    committing, to hold the lock as briefly as possible.
+    """
+    db.flush()
+    result = db.execute(
+        update(VersionCounter)
+        .where(VersionCounter.name == name)
+        .values(value=VersionCounter.value + 1)
+    )
+    if result.rowcount == 0:
+        db.execute(insert(VersionCounter).values(name=name, value=1))
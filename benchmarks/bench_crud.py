@@ -0,0 +1,128 @@
+"""
+Microbenchmarks of the hot paths of `app.crud`, on the SQLite database of the tests.
+
+    pytest benchmarks/bench_crud.py --benchmark-json=crud.json
+
+Besides the timings, each benchmark records the number of queries and the memory allocated
+(peak, in bytes) by a single call in its `extra_info`, which is part of the JSON report.
+"""
+
+import itertools
+import random
+import tracemalloc
+
+import pytest
+
+from app import crud, schemas
+from app.models import Experiment, Team
+from app.pagination import DEFAULT_PAGE_SIZE
+from benchmarks.load_test import pick_teams
+
+pytest.importorskip("pytest_benchmark")
+
+ROUNDS = 100
+
+
+def run_benchmark(benchmark, db, count_queries, function, setup=tuple):
+    """
+    Time `function(*setup())`, starting each round with an empty identity map, and record
+    the number of queries and the memory allocated by one call.
+    """
+
+    def prepare():
+        db.expunge_all()
+        return setup(), {}
+
+    # The first call fills the compiled statement cache and the team index
+    args, _ = prepare()
+    function(*args)
+
+    args, _ = prepare()
+    tracemalloc.start()
+    with count_queries() as counter:
+        function(*args)
+    benchmark.extra_info["queries"] = counter.count
+    benchmark.extra_info["peak_memory_bytes"] = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return benchmark.pedantic(function, setup=prepare, rounds=ROUNDS)
+
+
+def test_get_experiments(benchmark, db_session, count_queries, dataset):
+    experiments = run_benchmark(
+        benchmark,
+        db_session,
+        count_queries,
+        lambda: crud.get_experiments(db_session, limit=DEFAULT_PAGE_SIZE),
+    )
+    assert len(experiments) == DEFAULT_PAGE_SIZE
+
+
+def test_get_experiments_by_team(benchmark, db_session, count_queries, dataset):
+    run_benchmark(
+        benchmark,
+        db_session,
+        count_queries,
+        lambda: crud.get_experiments(db_session, team=dataset.teams[1], limit=DEFAULT_PAGE_SIZE),
+    )
+
+
+def test_get_experiments_by_team_with_descendants(benchmark, db_session, count_queries, dataset):
+    experiments = run_benchmark(
+        benchmark,
+        db_session,
+        count_queries,
+        lambda: crud.get_experiments(
+            db_session, team=dataset.teams[0], include_descendants=True, limit=DEFAULT_PAGE_SIZE
+        ),
+    )
+    assert experiments
+
+
+def test_add_teams_to_experiment(benchmark, db_session, count_queries, dataset):
+    rng = random.Random(0)
+
+    def setup():
+        db_session.rollback()
+        experiment = Experiment(description="Benchmark", sample_ratio=0.5)
+        db_session.add(experiment)
+        db_session.flush()
+        teams = [schemas.TeamBase(name=name) for name in pick_teams(dataset, rng, 2)]
+        return db_session, experiment, teams
+
+    run_benchmark(benchmark, db_session, count_queries, crud._add_teams_to_experiment, setup)
+    db_session.rollback()
+
+
+def test_is_descendant_of_deep_chain(benchmark, db_session, count_queries, chain):
+    def setup():
+        teams = db_session.query(Team).filter(Team.name.in_([chain[0], chain[-1]])).all()
+        root, leaf = sorted(teams, key=lambda team: team.id)
+        return leaf, root
+
+    assert run_benchmark(benchmark, db_session, count_queries, Team.is_descendant_of, setup)
+
+
+def test_create_experiment(benchmark, db_session, count_queries, dataset):
+    rng = random.Random(0)
+
+    def setup():
+        teams = [schemas.TeamBase(name=name) for name in pick_teams(dataset, rng)]
+        experiment = schemas.ExperimentCreate(description="Benchmark", sample_ratio=0.5, teams=teams)
+        return db_session, experiment
+
+    run_benchmark(benchmark, db_session, count_queries, crud.create_experiment, setup)
+
+
+def test_reassign_experiment_teams(benchmark, db_session, count_queries, dataset):
+    rng = random.Random(0)
+    experiment_id = next(
+        experiment_id for experiment_id, team_count in dataset.experiments.items() if team_count == 2
+    )
+    team_pairs = itertools.cycle([pick_teams(dataset, rng, 2) for _ in range(10)])
+
+    def setup():
+        teams = [schemas.TeamBase(name=name) for name in next(team_pairs)]
+        return db_session, schemas.ExperimentReassignTeams(teams=teams), experiment_id
+
+    run_benchmark(benchmark, db_session, count_queries, crud.reassign_experiment_teams, setup)
@@ -0,0 +1,58 @@
+import random
+
+import pytest
+
+from app import crud, schemas
+from benchmarks.load_test import experiment_payload, generate_teams
+from tests.conftest import TestingSessionLocal, count_queries, db_session, reset_database  # noqa: F401
+
+TEAMS = 1000
+DEPTH = 4
+FANOUT = 5
+EXPERIMENTS = 10000
+CHAIN_DEPTH = 200
+
+
+@pytest.fixture(scope="module")
+def seeded_database():
+    """Let the fixtures of a module seed the test database, and empty it after its benchmarks."""
+    reset_database()
+    yield
+    reset_database()
+
+
+@pytest.fixture(scope="module")
+def dataset(seeded_database):
+    """Seed team trees and experiments with 1-2 teams each, as the load test does."""
+    dataset = generate_teams(TEAMS, DEPTH, FANOUT)
+    rng = random.Random(0)
+
+    with TestingSessionLocal() as db:
+        crud.import_teams(
+            db,
+            [schemas.TeamImport(name=name, parent=parent) for name, parent in dataset.parents.items()],
+        )
+        results = crud.create_experiments(
+            db,
+            [schemas.ExperimentCreate(**experiment_payload(dataset, rng)) for _ in range(EXPERIMENTS)],
+        )
+        dataset.experiments = {experiment.id: len(experiment.teams) for experiment, _ in results}
+
+    return dataset
+
+
+@pytest.fixture(scope="module")
+def chain(seeded_database):
+    """Seed a chain of teams, each one the parent of the next, and return their names."""
+    names = [f"chain-{depth}" for depth in range(CHAIN_DEPTH)]
+
+    with TestingSessionLocal() as db:
+        crud.import_teams(
+            db,
+            [
+                schemas.TeamImport(name=name, parent=names[depth - 1] if depth else None)
+                for depth, name in enumerate(names)
+            ],
+        )
+
+    return names
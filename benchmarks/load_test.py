@@ -0,0 +1,302 @@
+"""
+HTTP load test of the API.
+
+Seeds a synthetic dataset through the bulk endpoints, then drives the real endpoints at a
+given concurrency and reports the throughput and latency percentiles of each scenario as JSON,
+so results can be compared between commits.
+
+Against a server which is already running:
+
+    python -m benchmarks.load_test --base-url http://localhost:8000
+
+Or starting a server on a local database, whose tables are dropped and recreated so that every
+run starts from the same data:
+
+    python -m benchmarks.load_test --database-url sqlite:///./bench.db --output results.json
+
+Compare with a previous run:
+
+    python -m benchmarks.load_test --database-url sqlite:///./bench.db --baseline results.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+
+import httpx
+
+SCENARIOS = ["list", "list_teams", "filtered_list", "create", "reassign"]
+
+
+@dataclass
+class Dataset:
+    teams: list[str]
+    parents: dict[str, str | None]
+    ancestors: dict[str, set[str]]
+    inner_teams: list[str]
+    experiments: dict[int, int] = field(default_factory=dict)  # ID -> number of teams
+
+
+def generate_teams(count: int, depth: int, fanout: int, prefix: str = "team") -> Dataset:
+    """
+    Generate `count` teams as a forest of trees with the given depth and fan-out, named after
+    `prefix` (team names are unique, so each run against the same database needs its own).
+    """
+    parents: dict[str, str | None] = {}
+    ancestors: dict[str, set[str]] = {}
+    while len(parents) < count:
+        level = [None]
+        for _ in range(depth):
+            next_level = []
+            for parent in level:
+                for _ in range(1 if parent is None else fanout):
+                    if len(parents) == count:
+                        break
+                    name = f"{prefix}-{len(parents)}"
+                    parents[name] = parent
+                    ancestors[name] = set() if parent is None else ancestors[parent] | {parent}
+                    next_level.append(name)
+            level = next_level
+    inner_teams = {parent for parent in parents.values() if parent is not None}
+    return Dataset(
+        teams=list(parents),
+        parents=parents,
+        ancestors=ancestors,
+        inner_teams=sorted(inner_teams) or list(parents),
+    )
+
+
+def pick_teams(dataset: Dataset, rng: random.Random, count: int | None = None) -> list[str]:
+    """
+    Pick 1 or 2 teams which are not descendants of each other.
+    """
+    count = count or rng.choice([1, 2])
+    while True:
+        teams = rng.sample(dataset.teams, count)
+        if count == 1 or (
+            teams[0] not in dataset.ancestors[teams[1]] and teams[1] not in dataset.ancestors[teams[0]]
+        ):
+            return teams
+
+
+def experiment_payload(dataset: Dataset, rng: random.Random, team_count: int | None = None) -> dict:
+    return {
+        "description": f"experiment-{rng.getrandbits(32)}",
+        "sample_ratio": round(rng.random(), 3),
+        "teams": [{"name": name} for name in pick_teams(dataset, rng, team_count)],
+    }
+
+
+async def seed(client: httpx.AsyncClient, args, rng: random.Random) -> Dataset:
+    dataset = generate_teams(args.teams, args.depth, args.fanout, args.prefix)
+
+    response = await client.post(
+        "/teams/bulk",
+        json=[{"name": name, "parent": parent} for name, parent in dataset.parents.items()],
+    )
+    response.raise_for_status()
+
+    for start in range(0, args.experiments, args.batch_size):
+        payload = [
+            experiment_payload(dataset, rng)
+            for _ in range(min(args.batch_size, args.experiments - start))
+        ]
+        response = await client.post("/experiments/bulk", json=payload)
+        response.raise_for_status()
+        for result in response.json():
+            experiment = result["experiment"]
+            dataset.experiments[experiment["id"]] = len(experiment["teams"])
+
+    return dataset
+
+
+def build_request(scenario: str, dataset: Dataset, rng: random.Random) -> tuple[str, str, dict | None]:
+    if scenario == "list":
+        return "GET", "/experiments/", None
+    if scenario == "list_teams":
+        return "GET", "/teams/", None
+    if scenario == "filtered_list":
+        team = rng.choice(dataset.inner_teams)
+        return "GET", f"/experiments/?team={team}&include_descendants=true", None
+    if scenario == "create":
+        return "POST", "/experiments/", experiment_payload(dataset, rng)
+    if scenario == "reassign":
+        experiment_id, team_count = rng.choice(list(dataset.experiments.items()))
+        payload = {"teams": experiment_payload(dataset, rng, team_count)["teams"]}
+        return "PATCH", f"/experiments/{experiment_id}/reassign_teams/", payload
+    raise ValueError(f"Unknown scenario: {scenario}")
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+async def run_scenario(
+    client: httpx.AsyncClient, scenario: str, dataset: Dataset, args, rng: random.Random
+) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    remaining = args.requests
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            method, url, payload = build_request(scenario, dataset, rng)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, url, json=payload)
+            except httpx.TransportError:
+                # E.g. the server dropping the connection of a failed request
+                response = None
+            latencies.append(time.perf_counter() - start)
+            if response is None or response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": latencies[-1] * 1000 if latencies else 0.0,
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(database_url: str) -> tuple[subprocess.Popen, str]:
+    env = {**os.environ, "DATABASE_URL": database_url}
+    subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "from app.database import Base, engine; from app import models; "
+            "Base.metadata.drop_all(bind=engine); Base.metadata.create_all(bind=engine)",
+        ],
+        env=env,
+        check=True,
+    )
+
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.asgi:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            httpx.get(f"{base_url}/pool/stats").raise_for_status()
+            return server, base_url
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("The server did not start")
+
+
+def git_commit() -> str | None:
+    result = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True)
+    return result.stdout.strip() or None
+
+
+def compare(results: dict, baseline: dict) -> dict:
+    """
+    Relative change of each metric compared to a previous run, e.g. 0.1 for +10%.
+    """
+    changes = {}
+    for scenario, metrics in results["scenarios"].items():
+        baseline_metrics = baseline["scenarios"].get(scenario)
+        if not baseline_metrics:
+            continue
+        changes[scenario] = {
+            name: (value - baseline_metrics[name]) / baseline_metrics[name]
+            for name, value in metrics.items()
+            if name in ("throughput", "p50_ms", "p95_ms", "p99_ms") and baseline_metrics.get(name)
+        }
+    return changes
+
+
+async def main(args):
+    rng = random.Random(args.seed)
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        server, base_url = start_server(args.database_url)
+
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+            dataset = await seed(client, args, rng)
+            results = {
+                "commit": git_commit(),
+                "timestamp": time.time(),
+                "parameters": {
+                    name: getattr(args, name)
+                    for name in ("teams", "depth", "fanout", "experiments", "concurrency", "requests", "seed")
+                },
+                "scenarios": {},
+            }
+            for scenario in args.scenarios:
+                results["scenarios"][scenario] = await run_scenario(client, scenario, dataset, args, rng)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            results["changes"] = compare(results, json.load(baseline_file))
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(output + "\n")
+    print(output)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--base-url", help="URL of a running server")
+    target.add_argument("--database-url", help="start a server on this database (SQLite or PostgreSQL)")
+    parser.add_argument("--teams", type=int, default=1000, help="number of teams")
+    parser.add_argument("--depth", type=int, default=4, help="depth of each team tree")
+    parser.add_argument("--fanout", type=int, default=5, help="number of children of each team")
+    parser.add_argument("--experiments", type=int, default=10000, help="number of experiments")
+    parser.add_argument("--batch-size", type=int, default=1000, help="experiments per bulk request")
+    parser.add_argument("--concurrency", type=int, default=10, help="number of concurrent clients")
+    parser.add_argument("--requests", type=int, default=1000, help="number of requests per scenario")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--seed", type=int, default=0, help="random seed of the dataset and requests")
+    parser.add_argument(
+        "--prefix",
+        default=f"load-{int(time.time())}",
+        help="prefix of the team names, unique per run by default",
+    )
+    parser.add_argument("--output", help="write the JSON results to this file")
+    parser.add_argument("--baseline", help="JSON results of a previous run to compare with")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
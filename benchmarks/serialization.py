@@ -0,0 +1,79 @@
+"""
+Compare the response_model path of the list endpoints (ORM objects validated into the schemas,
+then encoded with the stdlib JSON encoder, as FastAPI does) with the row path (dicts from column
+queries encoded with orjson), on an in-memory SQLite database.
+
+    python -m benchmarks.serialization --rows 100000
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+import orjson
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import crud, schemas
+from app.database import Base
+from app.seed import seed
+
+
+def encode_like_fastapi(adapter: TypeAdapter, items: list) -> bytes:
+    content = adapter.dump_python(adapter.validate_python(items, from_attributes=True), mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+def measure(function, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000, help="number of experiments and teams")
+    parser.add_argument("--repeat", type=int, default=5, help="number of runs (the median is reported)")
+    args = parser.parse_args(argv)
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(autoflush=False, bind=engine)()
+    seed(db, teams=args.rows, depth=5, fanout=10, experiments=args.rows)
+
+    experiment_list = TypeAdapter(list[schemas.Experiment])
+    team_list = TypeAdapter(list[schemas.Team])
+
+    def response_model_path(query, adapter):
+        def run():
+            db.expunge_all()
+            return encode_like_fastapi(adapter, query(db, limit=args.rows))
+        return run
+
+    def row_path(query):
+        return lambda: orjson.dumps(query(db, limit=args.rows))
+
+    results = {
+        "rows": args.rows,
+        "experiments": {
+            "response_model_ms": measure(response_model_path(crud.get_experiments, experiment_list), args.repeat),
+            "rows_ms": measure(row_path(crud.get_experiment_rows), args.repeat),
+        },
+        "teams": {
+            "response_model_ms": measure(response_model_path(crud.get_teams, team_list), args.repeat),
+            "rows_ms": measure(row_path(crud.get_team_rows), args.repeat),
+        },
+    }
+    for listing in ("experiments", "teams"):
+        results[listing]["speedup"] = results[listing]["response_model_ms"] / results[listing]["rows_ms"]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,49 @@
 import pytest
 from sqlalchemy import create_engine
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool, StaticPool
 from fastapi.testclient import TestClient
+from app import database
 from app.main import app
-from app.database import Base, get_db
-
-SQLITE_DATABASE_URL = "sqlite:///./test_db.db"
-
+from app.async_main import app as async_app
+from app.cache import experiments_cache
+from app.database import Base, get_async_db, get_async_read_db, get_db, get_read_db
+from app.models import VersionCounter
+from app.query_counter import QueryCounter
+from app.team_index import invalidate_team_index
+from app.versioning import DATA, TEAM_TREE
+
+# The single connection of the pool keeps the in-memory database alive
 engine = create_engine(
-    SQLITE_DATABASE_URL,
+    "sqlite://",
     connect_args={"check_same_thread": False},
     poolclass=StaticPool,
 )
 
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-Base.metadata.create_all(bind=engine)
+
+def create_database():
+    """Create the tables of the test database, and its version counters like the migrations."""
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        connection.execute(
+            insert(VersionCounter).on_conflict_do_nothing(),
+            [{"name": TEAM_TREE, "value": 0}, {"name": DATA, "value": 0}],
+        )
+
+
+def reset_database():
+    """Empty the test database, for data committed outside of the `db_session` transaction."""
+    Base.metadata.drop_all(bind=engine)
+    create_database()
+    invalidate_team_index()
+    experiments_cache.clear()
+
+
+create_database()
 
 
 @pytest.fixture(scope="function")
@@ -29,10 +56,12 @@ def db_session():
     session.close()
     transaction.rollback()
     connection.close()
+    invalidate_team_index()
+    experiments_cache.clear()
 
 
 @pytest.fixture(scope="function")
-def test_client(db_session):
+def test_client(db_session, monkeypatch):
     """Create a test client that uses the override_get_db fixture to return a session."""
 
     def override_get_db():
@@ -42,10 +71,51 @@ def test_client(db_session):
             db_session.close()
 
     app.dependency_overrides[get_db] = override_get_db
+    # Reads go to the same database, even if a read replica is configured
+    app.dependency_overrides[get_read_db] = override_get_db
+    # As do the sessions opened outside of the dependencies
+    monkeypatch.setattr(database, "open_read_session", lambda primary=False: db_session)
     with TestClient(app) as test_client:
         yield test_client
 
 
+@pytest.fixture(scope="function")
+def async_test_client(tmp_path, monkeypatch):
+    """Create a test client of the async application, backed by a fresh aiosqlite database."""
+    url = f"sqlite+aiosqlite:///{tmp_path / 'test_async_db.db'}"
+    sync_engine = create_engine(url.replace("+aiosqlite", ""))
+    Base.metadata.create_all(bind=sync_engine)
+    sync_engine.dispose()
+
+    async_engine = create_async_engine(url, poolclass=NullPool)
+    AsyncTestingSessionLocal = async_sessionmaker(autoflush=False, bind=async_engine)
+
+    async def override_get_async_db():
+        async with AsyncTestingSessionLocal() as db:
+            yield db
+
+    async_app.dependency_overrides[get_async_db] = override_get_async_db
+    async_app.dependency_overrides[get_async_read_db] = override_get_async_db
+    monkeypatch.setattr(
+        database, "open_async_read_session", lambda primary=False: AsyncTestingSessionLocal()
+    )
+    with TestClient(async_app) as test_client:
+        yield test_client
+    invalidate_team_index()
+    experiments_cache.clear()
+
+
+@pytest.fixture()
+def count_queries(db_session):
+    """Return a factory of query counters for the test database, expiring the session first."""
+
+    def query_counter():
+        db_session.expire_all()
+        return QueryCounter(engine)
+
+    return query_counter
+
+
 @pytest.fixture()
 def experiment_payload():
     """Generate an experiment payload."""
@@ -0,0 +1,138 @@
+import json
+
+
+def test_async_create_and_read_experiments(async_test_client, experiment_payload):
+    post_response = async_test_client.post("/experiments/", json=experiment_payload)
+    assert post_response.status_code == 201
+    assert post_response.json()["teams"] == experiment_payload["teams"]
+
+    get_response = async_test_client.get("/experiments/?team=Team A")
+    assert get_response.status_code == 200
+    assert [e["id"] for e in get_response.json()] == [post_response.json()["id"]]
+
+
+def test_async_read_experiment_not_found(async_test_client):
+    response = async_test_client.get("/experiments/9999")
+    assert response.status_code == 404
+
+
+def test_async_update_and_delete_experiment(async_test_client, experiment_payload, experiment_payload_updated):
+    experiment_id = async_test_client.post("/experiments/", json=experiment_payload).json()["id"]
+
+    response = async_test_client.put(f"/experiments/{experiment_id}/", json=experiment_payload_updated)
+    assert response.status_code == 200
+    assert response.json()["description"] == experiment_payload_updated["description"]
+
+    response = async_test_client.patch(
+        f"/experiments/{experiment_id}/reassign_teams/", json={"teams": experiment_payload_updated["teams"]}
+    )
+    assert response.status_code == 200
+    assert response.json()["teams"] == experiment_payload_updated["teams"]
+
+    response = async_test_client.delete(f"/experiments/{experiment_id}/")
+    assert response.status_code == 204
+    assert async_test_client.get(f"/experiments/{experiment_id}").status_code == 404
+
+
+def test_async_team_hierarchy(async_test_client, team_payload, team_payload_child, team_payload_descendant):
+    for payload in [team_payload, team_payload_child, team_payload_descendant]:
+        assert async_test_client.post("/teams/", json=payload).status_code == 201
+
+    response = async_test_client.get(f"/teams/{team_payload['name']}")
+    assert response.status_code == 200
+    assert response.json()["children"] == [{"name": "Team B", "id": 2}]
+
+    response = async_test_client.put(f"/teams/{team_payload['name']}/", json={"name": "Team A", "parent_id": 3})
+    assert response.status_code == 400
+
+    response = async_test_client.get("/teams/?limit=2")
+    assert [t["name"] for t in response.json()] == ["Team A", "Team B"]
+    assert "X-Next-Cursor" in response.headers
+
+    assert async_test_client.delete("/teams/Team B/").status_code == 204
+
+
+def test_async_create_experiments_bulk(async_test_client, experiment_payload):
+    response = async_test_client.post("/experiments/bulk", json=[experiment_payload, experiment_payload])
+    assert response.status_code == 201
+    assert [r["index"] for r in response.json()] == [0, 1]
+    assert len(async_test_client.get("/experiments/").json()) == 2
+
+
+def test_async_read_experiments_not_modified(async_test_client, experiment_payload):
+    etag = async_test_client.get("/experiments/").headers["ETag"]
+    assert async_test_client.get("/experiments/", headers={"If-None-Match": etag}).status_code == 304
+
+    async_test_client.post("/experiments/", json=experiment_payload)
+    assert async_test_client.get("/experiments/", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_async_read_sparse_fieldsets(async_test_client, experiment_payload):
+    experiment_id = async_test_client.post("/experiments/", json=experiment_payload).json()["id"]
+
+    assert async_test_client.get("/experiments/?fields=description&expand=").json() == [
+        {"description": "Experiment A", "id": experiment_id}
+    ]
+    assert async_test_client.get("/teams/Team A?fields=name&expand=").json() == {"name": "Team A", "id": 1}
+    assert async_test_client.get(f"/experiments/{experiment_id}?fields=owner").status_code == 400
+
+
+def test_async_read_team_tree(async_test_client, team_payload, team_payload_child):
+    async_test_client.post("/teams/", json=team_payload)
+    async_test_client.post("/teams/", json=team_payload_child)
+
+    assert async_test_client.get("/teams/Team A/tree?with_experiment_counts=true").json() == {
+        "name": "Team A", "id": 1, "experiment_count": 0, "children": [
+            {"name": "Team B", "id": 2, "experiment_count": 0, "children": []},
+        ],
+    }
+
+
+def test_async_team_ancestry(async_test_client, team_payload, team_payload_child):
+    async_test_client.post("/teams/", json=team_payload)
+    async_test_client.post("/teams/", json=team_payload_child)
+
+    assert async_test_client.get("/teams/Team B/ancestors").json() == [{"name": "Team A", "id": 1, "depth": 1}]
+    response = async_test_client.post("/teams/ancestry", json=[{"ancestor": "Team A", "descendant": "Team B"}])
+    assert response.json() == [{"ancestor": "Team A", "descendant": "Team B", "is_ancestor": True}]
+
+
+def test_async_import_teams(async_test_client):
+    response = async_test_client.post("/teams/bulk", json=[{"name": "Child", "parent": "Root"}, {"name": "Root"}])
+    assert response.status_code == 201
+    assert [team["name"] for team in response.json()] == ["Root", "Child"]
+
+
+def test_async_export_experiments(async_test_client, experiment_payload):
+    async_test_client.post("/experiments/bulk", json=[experiment_payload] * 3)
+
+    response = async_test_client.get("/experiments/export?team=Team B")
+    assert response.status_code == 200
+    assert [json.loads(line)["teams"] for line in response.text.splitlines()] == [experiment_payload["teams"]] * 3
+
+
+def test_async_read_team_stats(async_test_client, team_payload, experiment_payload):
+    async_test_client.post("/teams/", json=team_payload)
+    async_test_client.post("/teams/", json={"name": "Team B"})
+    async_test_client.post("/experiments/", json=experiment_payload)
+
+    response = async_test_client.get("/stats/teams?limit=1")
+    assert response.json()[0]["subtree_experiment_count"] == 1
+    assert "X-Next-Cursor" in response.headers
+
+
+def test_async_search_experiments(async_test_client, experiment_payload):
+    async_test_client.post("/experiments/", json=experiment_payload)
+
+    response = async_test_client.get("/experiments/search?q=experiment&team=Team B")
+    assert [result["description"] for result in response.json()] == ["Experiment A"]
+
+
+def test_async_read_experiments_by_sample_ratio(async_test_client, experiment_payload):
+    for sample_ratio in (0.2, 0.8, 0.5):
+        async_test_client.post("/experiments/", json=experiment_payload | {"sample_ratio": sample_ratio})
+
+    response = async_test_client.get("/experiments/?sort=-sample_ratio&max_sample_ratio=0.6&limit=1")
+    assert [experiment["sample_ratio"] for experiment in response.json()] == [0.5]
+    next_page = async_test_client.get(f"/experiments/?sort=-sample_ratio&max_sample_ratio=0.6&cursor={response.headers['X-Next-Cursor']}")
+    assert [experiment["sample_ratio"] for experiment in next_page.json()] == [0.2]
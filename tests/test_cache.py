@@ -0,0 +1,124 @@
+from app import crud, schemas
+from app.cache import ResponseCache, experiments_cache
+from app.models import Experiment
+from app.versioning import DATA, bump_version
+
+
+def test_response_cache_evicts_least_recently_used():
+    cache = ResponseCache("test_lru", max_entries=2, ttl=60)
+    cache.set("a", b"A", {}, cache.generation)
+    cache.set("b", b"B", {}, cache.generation)
+    cache.get("a")
+    cache.set("c", b"C", {}, cache.generation)
+
+    assert cache.get("b") is None
+    assert cache.get("a").content == b"A"
+    assert cache.get("c").content == b"C"
+    assert cache.stats() | {"ttl": None} == {
+        "size": 2, "max_size": 2, "ttl": None,
+        "hits": 3, "misses": 1, "evictions": 1, "expirations": 0, "invalidations": 0,
+    }
+
+
+def test_response_cache_expires_entries():
+    cache = ResponseCache("test_ttl", max_entries=2, ttl=0)
+    cache.set("a", b"A", {}, cache.generation)
+
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_response_cache_skips_responses_computed_before_an_invalidation():
+    cache = ResponseCache("test_generation", max_entries=2, ttl=60)
+    generation = cache.generation
+    cache.invalidate(lambda key: True)
+    cache.set("a", b"A", {}, generation)
+
+    assert cache.get("a") is None
+
+
+def create_tree(db_session):
+    """A > B > C, and D."""
+    a = crud.create_team(db_session, team=schemas.TeamCreate(name="A"))
+    b = crud.create_team(db_session, team=schemas.TeamCreate(name="B", parent_id=a.id))
+    crud.create_team(db_session, team=schemas.TeamCreate(name="C", parent_id=b.id))
+    crud.create_team(db_session, team=schemas.TeamCreate(name="D"))
+
+
+def create_experiment(db_session, *team_names):
+    return crud.create_experiment(
+        db_session,
+        experiment=schemas.ExperimentCreate(
+            description="Experiment",
+            sample_ratio=0.5,
+            teams=[{"name": name} for name in team_names],
+        ),
+    )
+
+
+def test_read_experiments_cached(db_session, test_client, count_queries):
+    create_tree(db_session)
+    create_experiment(db_session, "C")
+
+    response = test_client.get("/experiments/?team=A&include_descendants=true")
+    with count_queries() as counter:
+        cached_response = test_client.get("/experiments/?team=A&include_descendants=true")
+
+    assert counter.count == 1
+    assert cached_response.content == response.content
+    assert cached_response.headers["ETag"] == response.headers["ETag"]
+    assert len(cached_response.json()) == 1
+    assert test_client.get("/cache/stats").json()["hits"] == 1
+
+
+def test_write_rebuilds_every_listing(db_session, test_client, count_queries):
+    create_tree(db_session)
+    urls = ["/experiments/?team=C", "/experiments/?team=D&include_descendants=true"]
+    for url in urls:
+        test_client.get(url)
+
+    create_experiment(db_session, "C")
+
+    # Only the data version is queried for a cached page: any write, even to another team's
+    # experiments, makes the pages built before it unreachable
+    for url, length in zip(urls, [1, 0]):
+        with count_queries() as counter:
+            response = test_client.get(url)
+        assert counter.count > 1
+        assert len(response.json()) == length
+
+        with count_queries() as counter:
+            assert test_client.get(url).content == response.content
+        assert counter.count == 1
+
+
+def test_team_update_clears_listings(db_session, test_client):
+    create_tree(db_session)
+    create_experiment(db_session, "D")
+    test_client.get("/experiments/?team=D")
+
+    test_client.put("/teams/D/", json={"name": "E"})
+
+    assert len(experiments_cache) == 0
+    assert test_client.get("/experiments/").json()[0]["teams"] == [{"name": "E"}]
+
+
+def test_read_cache_metrics(db_session, test_client):
+    test_client.get("/experiments/")
+    test_client.get("/experiments/")
+
+    metrics = test_client.get("/metrics").text
+    assert f'response_cache_hits_total{{cache="experiments"}} {experiments_cache.hits}' in metrics
+
+
+def test_write_by_another_process_is_not_served_from_cache(db_session, test_client):
+    create_experiment(db_session, "A")
+    assert len(test_client.get("/experiments/").json()) == 1
+
+    # Another process writes, evicting the pages of its own cache only
+    experiment = Experiment(description="Experiment", sample_ratio=0.5)
+    db_session.add(experiment)
+    bump_version(db_session, DATA)
+    db_session.commit()
+
+    assert len(test_client.get("/experiments/").json()) == 2
@@ -0,0 +1,255 @@
+import json
+
+import pytest
+from sqlalchemy import select
+
+from app import crud, schemas
+from app.models import team_closure
+from app.serialization import dump_tree
+
+
+def closure_rows(db_session):
+    return set(
+        db_session.execute(
+            select(team_closure.c.ancestor_id, team_closure.c.descendant_id, team_closure.c.depth)
+        ).all()
+    )
+
+
+def create_chain(db_session, *names):
+    teams = []
+    for name in names:
+        parent_id = teams[-1].id if teams else None
+        teams.append(crud.create_team(db_session, team=schemas.TeamCreate(name=name, parent_id=parent_id)))
+    return teams
+
+
+def test_create_team_adds_closure_rows(db_session):
+    a, b, c = create_chain(db_session, "A", "B", "C")
+
+    assert closure_rows(db_session) == {
+        (a.id, a.id, 0), (b.id, b.id, 0), (c.id, c.id, 0),
+        (a.id, b.id, 1), (b.id, c.id, 1), (a.id, c.id, 2),
+    }
+    assert c.is_descendant_of(a)
+    assert not a.is_descendant_of(c)
+
+
+def test_update_team_moves_subtree(db_session):
+    a, b, c = create_chain(db_session, "A", "B", "C")
+    d = crud.create_team(db_session, team=schemas.TeamCreate(name="D"))
+
+    crud.update_team(db_session, team=schemas.TeamUpdate(name="B", parent_id=d.id), team_name="B")
+
+    assert closure_rows(db_session) == {
+        (a.id, a.id, 0), (b.id, b.id, 0), (c.id, c.id, 0), (d.id, d.id, 0),
+        (d.id, b.id, 1), (b.id, c.id, 1), (d.id, c.id, 2),
+    }
+
+
+def test_update_team_rejects_descendant_as_parent(db_session, test_client):
+    a, b, c = (team.id for team in create_chain(db_session, "A", "B", "C"))
+
+    response = test_client.put("/teams/A/", json={"name": "A", "parent_id": c})
+    assert response.status_code == 400
+    assert closure_rows(db_session) == {
+        (a, a, 0), (b, b, 0), (c, c, 0),
+        (a, b, 1), (b, c, 1), (a, c, 2),
+    }
+
+
+def test_delete_team_detaches_children(db_session):
+    a, b, c = create_chain(db_session, "A", "B", "C")
+
+    crud.delete_team(db_session, team_name="B")
+
+    assert closure_rows(db_session) == {(a.id, a.id, 0), (c.id, c.id, 0)}
+    assert crud.get_team_by_name(db_session, "C").parent_id is None
+
+
+def test_read_experiments_by_team_and_deep_descendants(db_session, test_client):
+    create_chain(db_session, *(f"Level {i}" for i in range(10)))
+    crud.create_experiment(
+        db_session,
+        experiment=schemas.ExperimentCreate(description="Deep", sample_ratio=0.1, teams=[{"name": "Level 9"}]),
+    )
+
+    response = test_client.get("/experiments/?team=Level 0&include_descendants=true")
+    assert [e["description"] for e in response.json()] == ["Deep"]
+
+    response = test_client.get("/experiments/?team=Level 0")
+    assert response.json() == []
+
+
+def test_import_teams(db_session, test_client):
+    root_id = crud.create_team(db_session, team=schemas.TeamCreate(name="Root")).id
+    payload = [
+        {"name": "Grandchild", "parent": "Child"},
+        {"name": "Child", "parent": "Root"},
+        {"name": "Sibling", "parent": "Root"},
+        {"name": "Other root"},
+    ]
+
+    response = test_client.post("/teams/bulk", json=payload)
+    assert response.status_code == 201
+    ids = {team["name"]: team["id"] for team in response.json()}
+    assert {team["name"]: team["parent_id"] for team in response.json()} == {
+        "Child": root_id, "Sibling": root_id, "Other root": None, "Grandchild": ids["Child"],
+    }
+    assert (root_id, ids["Grandchild"], 2) in closure_rows(db_session)
+    assert len(closure_rows(db_session)) == 9
+    assert test_client.get("/teams/Child").json()["children"] == [{"name": "Grandchild", "id": ids["Grandchild"]}]
+
+
+def test_import_teams_rejects_invalid_forests(db_session, test_client):
+    crud.create_team(db_session, team=schemas.TeamCreate(name="Root"))
+
+    cycle = [{"name": "A", "parent": "B"}, {"name": "B", "parent": "A"}, {"name": "C"}]
+    assert test_client.post("/teams/bulk", json=cycle).status_code == 400
+
+    duplicate = [{"name": "A"}, {"name": "A"}]
+    assert test_client.post("/teams/bulk", json=duplicate).status_code == 400
+
+    existing = [{"name": "Root"}]
+    assert test_client.post("/teams/bulk", json=existing).status_code == 400
+
+    unknown_parent = [{"name": "A", "parent": "Unknown"}]
+    assert test_client.post("/teams/bulk", json=unknown_parent).status_code == 404
+
+    assert [team["name"] for team in test_client.get("/teams/").json()] == ["Root"]
+
+
+def test_read_team_tree(db_session, test_client, count_queries):
+    created = crud.import_teams(
+        db_session,
+        [
+            schemas.TeamImport(name="A"),
+            schemas.TeamImport(name="B", parent="A"),
+            schemas.TeamImport(name="C", parent="B"),
+            schemas.TeamImport(name="D", parent="A"),
+            schemas.TeamImport(name="E"),
+        ],
+    )
+    crud.create_experiment(
+        db_session,
+        experiment=schemas.ExperimentCreate(description="X", sample_ratio=0.5, teams=[{"name": "B"}, {"name": "D"}]),
+    )
+    ids = {name: team_id for name, team_id, _ in created}
+
+    with count_queries() as counter:
+        response = test_client.get("/teams/A/tree")
+    assert counter.count == 1
+    assert response.json() == {
+        "name": "A", "id": ids["A"], "children": [
+            {"name": "B", "id": ids["B"], "children": [{"name": "C", "id": ids["C"], "children": []}]},
+            {"name": "D", "id": ids["D"], "children": []},
+        ],
+    }
+
+    response = test_client.get("/teams/A/tree?max_depth=1&with_experiment_counts=true")
+    assert response.json() == {
+        "name": "A", "id": ids["A"], "experiment_count": 0, "children": [
+            {"name": "B", "id": ids["B"], "experiment_count": 1, "children": []},
+            {"name": "D", "id": ids["D"], "experiment_count": 1, "children": []},
+        ],
+    }
+
+    assert test_client.get("/teams/F/tree").status_code == 404
+    assert test_client.get("/teams/A/tree?max_depth=-1").status_code == 422
+
+
+def test_read_large_team_tree(db_session, test_client, count_queries):
+    names = [f"Team {i}" for i in range(10000)]
+    crud.import_teams(
+        db_session,
+        [schemas.TeamImport(name=name, parent=names[(i - 1) // 10] if i else None) for i, name in enumerate(names)],
+    )
+
+    with count_queries() as counter:
+        tree = test_client.get("/teams/Team 0/tree?with_experiment_counts=true").json()
+    assert counter.count == 1
+
+    stack, count = [tree], 0
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node["children"])
+    assert count == 10000
+
+
+def test_dump_deep_tree():
+    tree = {"name": "0", "children": []}
+    node = tree
+    for depth in range(1, 400):
+        child = {"name": str(depth), "children": [{"name": "leaf", "children": []}]}
+        node["children"].append(child)
+        node = child
+
+    assert json.loads(dump_tree(tree)) == tree
+
+
+def test_read_team_ancestors(db_session, test_client, count_queries):
+    a_id, b_id, _ = (team.id for team in create_chain(db_session, "A", "B", "C"))
+
+    with count_queries() as counter:
+        response = test_client.get("/teams/C/ancestors")
+    assert counter.count == 1
+    assert response.json() == [
+        {"name": "B", "id": b_id, "depth": 1},
+        {"name": "A", "id": a_id, "depth": 2},
+    ]
+    assert test_client.get("/teams/A/ancestors").json() == []
+    assert test_client.get("/teams/D/ancestors").status_code == 404
+
+
+def test_check_ancestry(db_session, test_client, count_queries):
+    create_chain(db_session, "A", "B", "C")
+    crud.create_team(db_session, team=schemas.TeamCreate(name="D"))
+    pairs = [
+        {"ancestor": "A", "descendant": "C"},
+        {"ancestor": "C", "descendant": "A"},
+        {"ancestor": "B", "descendant": "B"},
+        {"ancestor": "A", "descendant": "D"},
+        {"ancestor": "A", "descendant": "E"},
+    ]
+
+    response = test_client.post("/teams/ancestry", json=pairs * 1000)
+    assert response.status_code == 200
+    assert [result["is_ancestor"] for result in response.json()[:5]] == [True, False, False, False, None]
+    assert response.json()[5] == {"ancestor": "A", "descendant": "C", "is_ancestor": True}
+
+    with count_queries() as counter:
+        test_client.post("/teams/ancestry", json=pairs * 1000)
+    assert counter.count == 1
+
+
+def test_read_team_stats(db_session, test_client, count_queries):
+    a_id, b_id, c_id = (team.id for team in create_chain(db_session, "A", "B", "C"))
+    d_id = crud.create_team(db_session, team=schemas.TeamCreate(name="D", parent_id=a_id)).id
+    for sample_ratio, team_names in ((0.2, ["B"]), (0.4, ["C", "D"]), (0.6, ["D"])):
+        crud.create_experiment(
+            db_session,
+            experiment=schemas.ExperimentCreate(
+                description="Experiment",
+                sample_ratio=sample_ratio,
+                teams=[{"name": name} for name in team_names],
+            ),
+        )
+
+    with count_queries() as counter:
+        response = test_client.get("/stats/teams")
+    assert counter.count == 1
+    stats = {team["name"]: team for team in response.json()}
+    assert stats["A"] == {
+        "name": "A", "id": a_id, "experiment_count": 0, "avg_sample_ratio": None,
+        "subtree_experiment_count": 3, "subtree_avg_sample_ratio": pytest.approx(0.4),
+    }
+    assert stats["B"]["subtree_experiment_count"] == 2
+    assert stats["B"]["subtree_avg_sample_ratio"] == pytest.approx(0.3)
+    assert (stats["D"]["experiment_count"], stats["D"]["avg_sample_ratio"]) == (2, pytest.approx(0.5))
+
+    response = test_client.get("/stats/teams?limit=2")
+    assert [team["id"] for team in response.json()] == [a_id, b_id]
+    next_page = test_client.get(f"/stats/teams?cursor={response.headers['X-Next-Cursor']}").json()
+    assert [team["id"] for team in next_page] == [c_id, d_id]
+    assert [team["id"] for team in test_client.get("/stats/teams?team=C").json()] == [c_id]
@@ -1,4 +1,6 @@
-from app import crud, schemas
+import json
+
+from app import crud, schemas, threaded_crud
 
 
 def assert_experiment_json_equal_to_payload(experiment_json, experiment_payload):
@@ -85,3 +87,392 @@ def test_delete_team(db_session, test_client, team_payload):
     team = crud.create_team(db_session, team=schemas.TeamCreate(**team_payload))
     response = test_client.delete(f"/teams/{team.name}/")
     assert response.status_code == 204
+
+
+def test_read_experiments_paginated(db_session, test_client, experiment_payload):
+    for i in range(3):
+        experiment_payload["description"] = f"Experiment {i}"
+        crud.create_experiment(db_session, experiment=schemas.ExperimentCreate(**experiment_payload))
+
+    first_page = test_client.get("/experiments/?limit=2")
+    assert first_page.status_code == 200
+    assert [e["description"] for e in first_page.json()] == ["Experiment 0", "Experiment 1"]
+
+    cursor = first_page.headers["X-Next-Cursor"]
+    second_page = test_client.get(f"/experiments/?limit=2&cursor={cursor}")
+    assert second_page.status_code == 200
+    assert [e["description"] for e in second_page.json()] == ["Experiment 2"]
+    assert "X-Next-Cursor" not in second_page.headers
+
+
+def test_read_experiments_by_team_and_descendants_paginated(
+    db_session, test_client, team_payload, team_payload_child
+):
+    team = crud.create_team(db_session, team=schemas.TeamCreate(**team_payload))
+    child_team = crud.create_team(db_session, team=schemas.TeamCreate(**team_payload_child))
+    for i, team_name in enumerate([team.name, child_team.name, "Team X"]):
+        crud.create_experiment(
+            db_session,
+            experiment=schemas.ExperimentCreate(
+                description=f"Experiment {i}", sample_ratio=0.5, teams=[{"name": team_name}]
+            ),
+        )
+
+    first_page = test_client.get(f"/experiments/?team={team.name}&include_descendants=true&limit=1")
+    assert [e["description"] for e in first_page.json()] == ["Experiment 0"]
+
+    cursor = first_page.headers["X-Next-Cursor"]
+    second_page = test_client.get(
+        f"/experiments/?team={team.name}&include_descendants=true&limit=1&cursor={cursor}"
+    )
+    assert [e["description"] for e in second_page.json()] == ["Experiment 1"]
+    assert "X-Next-Cursor" not in second_page.headers
+
+
+def test_read_experiments_by_sample_ratio(db_session, test_client, team_payload, team_payload_child):
+    crud.create_team(db_session, team=schemas.TeamCreate(**team_payload))
+    crud.create_team(db_session, team=schemas.TeamCreate(**team_payload_child))
+    for i, (sample_ratio, team_name) in enumerate(
+        [(0.3, "Team A"), (0.7, "Team B"), (0.3, "Team B"), (0.9, "Team A"), (0.1, "Team B"), (0.5, "Team X")]
+    ):
+        crud.create_experiment(
+            db_session,
+            experiment=schemas.ExperimentCreate(
+                description=f"Experiment {i}", sample_ratio=sample_ratio, teams=[{"name": team_name}]
+            ),
+        )
+
+    def read_all(url):
+        experiments, cursor = [], None
+        while True:
+            response = test_client.get(url + (f"&cursor={cursor}" if cursor else ""))
+            assert response.status_code == 200
+            experiments += response.json()
+            cursor = response.headers.get("X-Next-Cursor")
+            if cursor is None:
+                return [(e["sample_ratio"], e["description"]) for e in experiments]
+
+    assert read_all("/experiments/?limit=2&sort=sample_ratio&fields=description") == [
+        (0.1, "Experiment 4"), (0.3, "Experiment 0"), (0.3, "Experiment 2"),
+        (0.5, "Experiment 5"), (0.7, "Experiment 1"), (0.9, "Experiment 3"),
+    ]
+    assert read_all("/experiments/?limit=2&sort=-sample_ratio&min_sample_ratio=0.3&max_sample_ratio=0.7") == [
+        (0.7, "Experiment 1"), (0.5, "Experiment 5"), (0.3, "Experiment 2"), (0.3, "Experiment 0"),
+    ]
+    assert read_all(
+        "/experiments/?limit=1&sort=-id&min_sample_ratio=0.2&team=Team A&include_descendants=true"
+    ) == [(0.9, "Experiment 3"), (0.3, "Experiment 2"), (0.7, "Experiment 1"), (0.3, "Experiment 0")]
+
+    cursor = test_client.get("/experiments/?limit=1").headers["X-Next-Cursor"]
+    assert test_client.get(f"/experiments/?sort=sample_ratio&cursor={cursor}").status_code == 400
+    assert test_client.get("/experiments/?sort=description").status_code == 422
+
+
+def test_read_experiments_invalid_cursor(test_client):
+    response = test_client.get("/experiments/?cursor=not-a-cursor")
+    assert response.status_code == 400
+
+
+def test_read_teams_paginated(db_session, test_client):
+    for name in ["Team A", "Team B", "Team C"]:
+        crud.create_team(db_session, team=schemas.TeamCreate(name=name))
+
+    first_page = test_client.get("/teams/?limit=2")
+    assert [t["name"] for t in first_page.json()] == ["Team A", "Team B"]
+
+    second_page = test_client.get(f"/teams/?limit=2&cursor={first_page.headers['X-Next-Cursor']}")
+    assert [t["name"] for t in second_page.json()] == ["Team C"]
+
+
+def test_read_experiments_query_count_is_constant(db_session, test_client, count_queries, experiment_payload):
+    crud.create_experiment(db_session, experiment=schemas.ExperimentCreate(**experiment_payload))
+    with count_queries() as counter:
+        test_client.get("/experiments/")
+    assert counter.count == 3
+
+    for i in range(5):
+        experiment_payload["teams"] = [{"name": f"Team {i}"}]
+        crud.create_experiment(db_session, experiment=schemas.ExperimentCreate(**experiment_payload))
+    with count_queries() as counter:
+        response = test_client.get("/experiments/")
+    assert len(response.json()) == 6
+    assert counter.count == 3
+
+
+def test_read_teams_query_count_is_constant(db_session, test_client, count_queries, team_payload, experiment_payload):
+    crud.create_team(db_session, team=schemas.TeamCreate(**team_payload))
+    with count_queries() as counter:
+        test_client.get("/teams/")
+    assert counter.count == 4
+
+    crud.create_experiment(db_session, experiment=schemas.ExperimentCreate(**experiment_payload))
+    for i in range(5):
+        crud.create_team(db_session, team=schemas.TeamCreate(name=f"Child {i}", parent_id=1))
+    with count_queries() as counter:
+        response = test_client.get("/teams/")
+    assert len(response.json()) == 7
+    assert counter.count == 4
+
+
+def test_read_experiments_in_one_threadpool_trip(db_session, test_client, monkeypatch, experiment_payload):
+    test_client.post("/experiments/", json=experiment_payload)
+    trips = []
+
+    async def run_in_threadpool(function, *args, **kwargs):
+        trips.append(function)
+        return function(*args, **kwargs)
+
+    monkeypatch.setattr(threaded_crud, "run_in_threadpool", run_in_threadpool)
+    response = test_client.get("/experiments/")
+    cached_response = test_client.get("/experiments/")
+    not_modified_response = test_client.get("/experiments/", headers={"If-None-Match": response.headers["ETag"]})
+
+    assert len(response.json()) == 1
+    assert cached_response.content == response.content
+    assert not_modified_response.status_code == 304
+    assert len(trips) == 3
+
+
+def test_read_experiments_not_modified(db_session, test_client, count_queries, experiment_payload):
+    response = test_client.get("/experiments/")
+    etag = response.headers["ETag"]
+
+    with count_queries() as counter:
+        response = test_client.get("/experiments/", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.content == b""
+    assert counter.count == 1
+
+    response = test_client.get("/experiments/", headers={"If-None-Match": f'"other", W/{etag}'})
+    assert response.status_code == 304
+
+    test_client.post("/experiments/", json=experiment_payload)
+    response = test_client.get("/experiments/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert len(response.json()) == 1
+
+
+def test_read_teams_etag_changes_with_writes(db_session, test_client, team_payload, experiment_payload):
+    etags = [test_client.get("/teams/").headers["ETag"]]
+
+    test_client.post("/teams/", json=team_payload)
+    etags.append(test_client.get("/teams/").headers["ETag"])
+    test_client.post("/experiments/", json=experiment_payload)
+    etags.append(test_client.get("/teams/").headers["ETag"])
+    test_client.delete("/teams/Team B/")
+    etags.append(test_client.get("/teams/").headers["ETag"])
+
+    assert len(set(etags)) == 4
+    assert test_client.get("/teams/", headers={"If-None-Match": etags[-1]}).status_code == 304
+
+
+def test_data_version_is_bumped_last(db_session, count_queries, experiment_payload, experiment_payload_updated):
+    experiment = crud.create_experiment(db_session, experiment=schemas.ExperimentCreate(**experiment_payload))
+
+    with count_queries() as counter:
+        crud.update_experiment(
+            db_session,
+            experiment=schemas.ExperimentUpdate(**experiment_payload_updated),
+            experiment_id=experiment.id,
+        )
+
+    # The row of the counter stays locked until the commit, so only reads come after it
+    bump = next(
+        index for index, statement in enumerate(counter.statements) if statement.startswith("UPDATE version_counter")
+    )
+    assert any(statement.startswith("UPDATE experiment") for statement in counter.statements[:bump])
+    assert all(statement.startswith("SELECT") for statement in counter.statements[bump + 1:])
+
+
+def test_experiment_and_team_rows_match_response_models(db_session, team_payload_child):
+    crud.create_team(db_session, team=schemas.TeamCreate(name="Team A"))
+    crud.create_team(db_session, team=schemas.TeamCreate(**team_payload_child))
+    for teams in ([{"name": "Team A"}], [{"name": "Team B"}, {"name": "Team C"}], [{"name": "Team C"}]):
+        crud.create_experiment(
+            db_session,
+            experiment=schemas.ExperimentCreate(description="Experiment", sample_ratio=0.25, teams=teams),
+        )
+
+    def sort_lists(rows):
+        return [
+            {key: sorted(value, key=json.dumps) if isinstance(value, list) else value for key, value in row.items()}
+            for row in rows
+        ]
+
+    experiments = crud.get_experiments(db_session, team="Team A", include_descendants=True)
+    assert sort_lists(crud.get_experiment_rows(db_session, team="Team A", include_descendants=True)) == sort_lists(
+        [schemas.Experiment.model_validate(experiment, from_attributes=True).model_dump() for experiment in experiments]
+    )
+    assert sort_lists(crud.get_team_rows(db_session)) == sort_lists(
+        [schemas.Team.model_validate(team, from_attributes=True).model_dump() for team in crud.get_teams(db_session)]
+    )
+
+
+def test_read_experiments_sparse_fieldsets(db_session, test_client, count_queries, experiment_payload):
+    experiment_id = test_client.post("/experiments/", json=experiment_payload).json()["id"]
+
+    with count_queries() as counter:
+        response = test_client.get("/experiments/?fields=sample_ratio&expand=")
+    assert response.json() == [{"sample_ratio": 0.5, "id": experiment_id}]
+    assert counter.count == 2
+    assert not any("team" in statement for statement in counter.statements[1:])
+
+    response = test_client.get(f"/experiments/{experiment_id}?fields=description&expand=teams")
+    assert response.json() == {"description": "Experiment A", "id": experiment_id, "teams": experiment_payload["teams"]}
+
+    response = test_client.get(f"/experiments/{experiment_id}")
+    assert response.json() == {**experiment_payload, "id": experiment_id}
+
+
+def test_read_teams_sparse_fieldsets(db_session, test_client, team_payload, team_payload_child):
+    test_client.post("/teams/", json=team_payload)
+    test_client.post("/teams/", json=team_payload_child)
+
+    response = test_client.get("/teams/?fields=name&expand=")
+    assert response.json() == [{"name": "Team A", "id": 1}, {"name": "Team B", "id": 2}]
+
+    response = test_client.get("/teams/Team A?fields=&expand=children")
+    assert response.json() == {"id": 1, "children": [{"name": "Team B", "id": 2}]}
+
+
+def test_sparse_fieldsets_in_openapi_schema(test_client):
+    openapi = test_client.get("/openapi.json").json()
+    components = openapi["components"]["schemas"]
+    for path, schema in [
+        ("/experiments/", "SparseExperiment"),
+        ("/experiments/{experiment_id}", "SparseExperiment"),
+        ("/experiments/search", "SparseExperimentSearchResult"),
+        ("/teams/", "SparseTeam"),
+        ("/teams/{team_name}", "SparseTeam"),
+    ]:
+        assert schema in json.dumps(openapi["paths"][path]["get"]["responses"]["200"]), path
+
+    assert components["SparseExperiment"]["required"] == ["id"]
+    assert components["SparseExperimentSearchResult"]["required"] == ["id", "rank"]
+    assert components["SparseTeam"]["required"] == ["id"]
+
+
+def test_read_unknown_fields(test_client):
+    response = test_client.get("/experiments/?fields=description,owner")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Unknown fields: owner. Allowed values: description, sample_ratio"
+
+    assert test_client.get("/teams/?expand=parent").status_code == 400
+    assert test_client.get("/teams/Team A?fields=teams").status_code == 400
+
+
+def test_create_experiments_bulk(db_session, test_client, team_payload, team_payload_child):
+    crud.create_team(db_session, team=schemas.TeamCreate(**team_payload))
+    crud.create_team(db_session, team=schemas.TeamCreate(**team_payload_child))
+    payload = [
+        {"description": f"Experiment {i}", "sample_ratio": 0.1, "teams": [{"name": "Team A"}, {"name": f"Team {i}"}]}
+        for i in range(10, 60)
+    ]
+
+    response = test_client.post("/experiments/bulk", json=payload)
+    assert response.status_code == 201
+    results = response.json()
+    assert [r["experiment"]["description"] for r in results] == [p["description"] for p in payload]
+    assert results[-1]["experiment"]["teams"] == payload[-1]["teams"]
+    assert all(r["error"] is None for r in results)
+
+    assert len(test_client.get("/experiments/?team=Team 59").json()) == 1
+
+
+def test_create_experiments_bulk_empty(db_session, test_client, count_queries):
+    etag = test_client.get("/experiments/").headers["ETag"]
+
+    with count_queries() as counter:
+        response = test_client.post("/experiments/bulk", json=[])
+    assert response.status_code == 201
+    assert response.json() == []
+    assert counter.count == 0
+    assert test_client.get("/experiments/").headers["ETag"] == etag
+
+
+def test_create_experiments_bulk_atomic(db_session, test_client, team_payload, team_payload_child):
+    crud.create_team(db_session, team=schemas.TeamCreate(**team_payload))
+    crud.create_team(db_session, team=schemas.TeamCreate(**team_payload_child))
+    payload = [
+        {"description": "Valid", "sample_ratio": 0.1, "teams": [{"name": "Team A"}]},
+        {"description": "Descendants", "sample_ratio": 0.1, "teams": [{"name": "Team A"}, {"name": "Team B"}]},
+        {"description": "Duplicates", "sample_ratio": 0.1, "teams": [{"name": "Team C"}, {"name": "Team C"}]},
+        {"description": "No teams", "sample_ratio": 0.1, "teams": []},
+    ]
+
+    response = test_client.post("/experiments/bulk", json=payload)
+    assert response.status_code == 400
+    assert [error["index"] for error in response.json()["detail"]] == [1, 2, 3]
+    assert test_client.get("/experiments/").json() == []
+
+
+def test_create_experiments_bulk_per_item(db_session, test_client, team_payload, team_payload_child):
+    crud.create_team(db_session, team=schemas.TeamCreate(**team_payload))
+    crud.create_team(db_session, team=schemas.TeamCreate(**team_payload_child))
+    payload = [
+        {"description": "Valid", "sample_ratio": 0.1, "teams": [{"name": "Team A"}, {"name": "Team C"}]},
+        {"description": "Descendants", "sample_ratio": 0.1, "teams": [{"name": "Team B"}, {"name": "Team A"}]},
+    ]
+
+    response = test_client.post("/experiments/bulk?atomic=false", json=payload)
+    assert response.status_code == 201
+    valid, invalid = response.json()
+    assert valid["experiment"]["description"] == "Valid"
+    assert invalid["experiment"] is None
+    assert invalid["error"] == "Cannot set a team's descendant as its parent"
+    assert [e["description"] for e in test_client.get("/experiments/").json()] == ["Valid"]
+
+
+def test_export_experiments(db_session, test_client, team_payload, team_payload_child, experiment_payload):
+    crud.create_team(db_session, team=schemas.TeamCreate(**team_payload))
+    crud.create_team(db_session, team=schemas.TeamCreate(**team_payload_child))
+    for i in range(150):
+        crud.create_experiment(
+            db_session,
+            experiment=schemas.ExperimentCreate(
+                description=f"Experiment {i}", sample_ratio=0.5, teams=[{"name": "Team B"}, {"name": f"Team {i}"}]
+            ),
+        )
+    experiment_payload["teams"] = [{"name": "Team A"}]
+    crud.create_experiment(db_session, experiment=schemas.ExperimentCreate(**experiment_payload))
+
+    response = test_client.get("/experiments/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == 151
+    assert lines[0]["description"] == "Experiment 0"
+    assert sorted(team["name"] for team in lines[0]["teams"]) == ["Team 0", "Team B"]
+
+    response = test_client.get("/experiments/export?team=Team A&include_descendants=true")
+    assert len(response.text.splitlines()) == 151
+
+    response = test_client.get("/experiments/export?team=Team A")
+    assert [json.loads(line)["description"] for line in response.text.splitlines()] == ["Experiment A"]
+
+
+def test_create_missing_teams_skips_taken_names(db_session):
+    existing = crud.create_team(db_session, team=schemas.TeamCreate(name="Team A"))
+
+    # "Team A" is missing from the caller's point of view, as if it was created concurrently
+    team_ids = crud._create_missing_teams(db_session, ["Team A", "Team B"])
+
+    assert team_ids["Team A"] == existing.id
+    assert crud.get_team_by_name(db_session, "Team B").id == team_ids["Team B"]
+
+
+def test_create_experiment_query_count_does_not_depend_on_existing_teams(
+    db_session, count_queries, experiment_payload
+):
+    with count_queries() as counter_with_missing_teams:
+        crud.create_experiment(db_session, experiment=schemas.ExperimentCreate(**experiment_payload))
+    with count_queries() as counter_with_existing_teams:
+        crud.create_experiment(db_session, experiment=schemas.ExperimentCreate(**experiment_payload))
+
+    team_name_lookups = [
+        statement for statement in counter_with_existing_teams.statements if "team.name IN" in statement
+    ]
+    assert len(team_name_lookups) == 1
+    assert counter_with_missing_teams.count <= counter_with_existing_teams.count + 5
@@ -0,0 +1,67 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.metrics import Histogram, MetricFamily
+
+
+def parse_metrics(text):
+    return {
+        line.rsplit(" ", 1)[0]: float(line.rsplit(" ", 1)[1])
+        for line in text.splitlines()
+        if line and not line.startswith("#")
+    }
+
+
+def test_metric_family_exposition():
+    family = MetricFamily("latency_seconds", "Latency", "histogram", ("route",), buckets=(0.1, 1.0))
+    family.labels('/a"b').observe(0.5)
+
+    assert family.collect() == [
+        "# HELP latency_seconds Latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{route="/a\\"b",le="0.1"} 0',
+        'latency_seconds_bucket{route="/a\\"b",le="1"} 1',
+        'latency_seconds_bucket{route="/a\\"b",le="+Inf"} 1',
+        'latency_seconds_sum{route="/a\\"b"} 0.5',
+        'latency_seconds_count{route="/a\\"b"} 1',
+    ]
+
+
+def test_histogram_cumulative_counts():
+    histogram = Histogram(buckets=(1.0, 2.0))
+    for value in [0.5, 1.0, 1.5, 3.0]:
+        histogram.observe(value)
+
+    assert histogram.cumulative_counts() == [(1.0, 2), (2.0, 3), (float("inf"), 4)]
+
+
+def test_read_metrics(test_client, experiment_payload):
+    before = parse_metrics(test_client.get("/metrics").text)
+    test_client.post("/experiments/", json=experiment_payload)
+    test_client.get("/experiments/")
+    test_client.get("/experiments/9999")
+    response = test_client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    after = parse_metrics(response.text)
+
+    def increase(sample):
+        return after.get(sample, 0) - before.get(sample, 0)
+
+    assert increase('http_requests_total{method="GET",route="/experiments/",status="200"}') == 1
+    assert increase('http_requests_total{method="GET",route="/experiments/{experiment_id}",status="404"}') == 1
+    assert increase('http_requests_total{method="POST",route="/experiments/",status="201"}') == 1
+    assert increase('http_request_db_queries_sum{method="GET",route="/experiments/"}') == 3
+    assert increase('db_query_duration_seconds_count{method="GET",route="/experiments/",operation="SELECT"}') == 3
+    assert after['http_requests_in_progress{method="GET",route="/experiments/"}'] == 0
+
+
+def test_failed_query_leaves_no_timing_on_the_connection(db_session):
+    connection = db_session.connection()
+    with pytest.raises(OperationalError):
+        connection.execute(text("SELECT * FROM missing_table"))
+
+    assert connection.execute(text("SELECT 1")).scalar() == 1
+    assert "query_start_time" not in connection.info
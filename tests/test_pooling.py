@@ -0,0 +1,44 @@
+from sqlalchemy import create_engine, text
+
+from app.pooling import (
+    InstrumentedNullPool,
+    InstrumentedQueuePool,
+    get_pool_options,
+    get_pool_stats,
+)
+
+
+def test_get_pool_options(monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "20")
+    monkeypatch.setenv("DB_POOL_PRE_PING", "true")
+    options = get_pool_options("test")
+    assert options["poolclass"] is InstrumentedQueuePool
+    assert options["pool_size"] == 20
+    assert options["pool_pre_ping"] is True
+
+    monkeypatch.setenv("DB_POOL_MODE", "null")
+    options = get_pool_options("test")
+    assert options["poolclass"] is InstrumentedNullPool
+    assert "pool_size" not in options
+
+
+def test_get_pool_stats(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/pool.db", **get_pool_options("test_stats"))
+
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+        stats = get_pool_stats(engine)
+        assert stats["checked_out"] == 1
+        assert stats["size"] == 5
+
+    stats = get_pool_stats(engine)
+    assert stats["checked_out"] == 0
+    assert stats["checked_in"] == 1
+    assert stats["wait_time"]["count"] == 1
+    assert stats["wait_time"]["buckets"]["inf"] == 1
+
+
+def test_read_pool_stats(test_client):
+    response = test_client.get("/pool/stats")
+    assert response.status_code == 200
+    assert "wait_time" in response.json()
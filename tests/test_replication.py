@@ -0,0 +1,125 @@
+import json
+import time
+
+import pytest
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import crud, database, schemas
+from app.async_main import app as async_app
+from app.database import Base, get_async_db, get_async_read_db, get_db, get_read_db, open_read_session
+from app.main import app
+from app.models import VersionCounter
+from app.replication import READ_PRIMARY_COOKIE
+from app.versioning import DATA, TEAM_TREE
+
+
+@pytest.fixture()
+def replica_session(tmp_path, monkeypatch):
+    """A session of a second SQLite database, standing in for a read replica of the test database."""
+    # Not in memory like the test database, as the team index is cached per database URL
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'test_replica_db.db'}",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        connection.execute(
+            insert(VersionCounter).on_conflict_do_nothing(),
+            [{"name": TEAM_TREE, "value": 0}, {"name": DATA, "value": 0}],
+        )
+
+    ReplicaSessionLocal = sessionmaker(autoflush=False, bind=engine)
+    monkeypatch.setattr(database, "ReplicaSessionLocal", ReplicaSessionLocal)
+    with ReplicaSessionLocal() as session:
+        yield session
+    engine.dispose()
+
+
+@pytest.fixture()
+def replicated_client(test_client, replica_session, monkeypatch):
+    """A test client whose reads go through the actual replica routing."""
+    monkeypatch.delitem(app.dependency_overrides, get_read_db)
+    return test_client
+
+
+def create_experiment(db_session, description):
+    return crud.create_experiment(
+        db_session,
+        experiment=schemas.ExperimentCreate(description=description, sample_ratio=0.5, teams=[{"name": "A"}]),
+    )
+
+
+def test_get_routes_read_from_replica():
+    for application, write_dependency, read_dependency in (
+        (app, get_db, get_read_db),
+        (async_app, get_async_db, get_async_read_db),
+    ):
+        for route in application.routes:
+            if not isinstance(route, APIRoute):
+                continue
+            dependencies = {dependency.call for dependency in route.dependant.dependencies}
+            if "GET" in route.methods:
+                assert write_dependency not in dependencies, route.path
+            elif read_dependency in dependencies:
+                pytest.fail(f"{route.path} reads from the replica")
+
+
+def test_reads_go_to_replica(db_session, replica_session, replicated_client):
+    create_experiment(db_session, "On the primary only")
+    create_experiment(replica_session, "Replicated")
+
+    response = replicated_client.get("/experiments/")
+    assert [experiment["description"] for experiment in response.json()] == ["Replicated"]
+    assert replicated_client.get("/teams/A").status_code == 200
+
+
+def test_export_reads_from_replica(db_session, replica_session, replicated_client, monkeypatch):
+    monkeypatch.setattr(database, "open_read_session", open_read_session)
+    create_experiment(db_session, "On the primary only")
+    create_experiment(replica_session, "Replicated")
+
+    response = replicated_client.get("/experiments/export")
+    assert [json.loads(line)["description"] for line in response.text.splitlines()] == ["Replicated"]
+
+
+def test_client_reads_its_own_writes(db_session, replica_session, replicated_client):
+    response = replicated_client.post("/teams/", json={"name": "Written"})
+    assert response.status_code == 201
+    assert float(response.cookies[READ_PRIMARY_COOKIE]) > time.time()
+
+    # The client reads from the primary, other clients from the lagging replica
+    assert replicated_client.get("/teams/Written").status_code == 200
+    with TestClient(app) as other_client:
+        assert other_client.get("/teams/Written").status_code == 404
+
+    # Until the window ends
+    replicated_client.cookies.set(READ_PRIMARY_COOKIE, str(time.time() - 1))
+    assert replicated_client.get("/teams/Written").status_code == 404
+
+
+def test_failed_writes_do_not_pin_to_primary(replicated_client):
+    response = replicated_client.get("/experiments/")
+    assert READ_PRIMARY_COOKIE not in response.cookies
+
+    response = replicated_client.delete("/experiments/1/")
+    assert response.status_code == 404
+    assert READ_PRIMARY_COOKIE not in response.cookies
+
+
+def test_client_reading_its_own_writes_skips_cached_pages(db_session, replica_session, replicated_client):
+    with TestClient(app) as other_client:
+        assert other_client.get("/experiments/").json() == []
+
+        replicated_client.post(
+            "/experiments/", json={"description": "Written", "sample_ratio": 0.5, "teams": [{"name": "A"}]}
+        )
+        # Cached by another client from the replica after the write evicted the page
+        assert other_client.get("/experiments/").json() == []
+
+    assert [experiment["description"] for experiment in replicated_client.get("/experiments/").json()] == ["Written"]
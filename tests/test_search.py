@@ -0,0 +1,82 @@
+from app import crud, schemas
+from app.search import search_terms
+
+
+def create_experiment(db_session, description, team_name="A"):
+    return crud.create_experiment(
+        db_session,
+        experiment=schemas.ExperimentCreate(
+            description=description, sample_ratio=0.5, teams=[{"name": team_name}]
+        ),
+    ).id
+
+
+def test_search_terms():
+    assert search_terms("Red-fox, jumps_over?") == ["red", "fox", "jumps", "over"]
+    assert search_terms(' "* & |') == []
+
+
+def test_search_experiments(db_session, test_client):
+    red_fox, red_red_fox, _, reddish_fox = (
+        create_experiment(db_session, description)
+        for description in ("Red fox", "Red red fox", "Blue whale", "Reddish fox")
+    )
+
+    response = test_client.get("/experiments/search?q=red fox")
+    assert response.status_code == 200
+    results = response.json()
+    assert {result["id"] for result in results} == {red_fox, red_red_fox, reddish_fox}
+    assert [result["rank"] for result in results] == sorted((result["rank"] for result in results), reverse=True)
+    assert results[0] == {
+        "description": "Red red fox", "sample_ratio": 0.5, "id": red_red_fox, "teams": [{"name": "A"}],
+        "rank": results[0]["rank"],
+    }
+
+    assert [result["id"] for result in test_client.get("/experiments/search?q=FOX REDD").json()] == [reddish_fox]
+    assert test_client.get("/experiments/search?q=fox jumps").json() == []
+    assert test_client.get("/experiments/search?q=*").json() == []
+    assert test_client.get("/experiments/search?q=").status_code == 422
+
+
+def test_search_experiments_pages(db_session, test_client):
+    for index in range(7):
+        create_experiment(db_session, "Checkout button" if index % 2 else "Checkout button color")
+    create_experiment(db_session, "Landing page")
+
+    results, cursor = [], None
+    while True:
+        response = test_client.get("/experiments/search?q=checkout&limit=2&fields=" + (f"&cursor={cursor}" if cursor else ""))
+        results += response.json()
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+
+    assert len(results) == 7
+    assert results == sorted(results, key=lambda result: (-result["rank"], result["id"]))
+    assert test_client.get("/experiments/search?q=checkout&cursor=eyJpZCI6MX0").status_code == 400
+
+
+def test_search_experiments_by_team(db_session, test_client):
+    a = crud.create_team(db_session, team=schemas.TeamCreate(name="A"))
+    crud.create_team(db_session, team=schemas.TeamCreate(name="B", parent_id=a.id))
+    in_a = create_experiment(db_session, "Pricing test", "A")
+    in_b = create_experiment(db_session, "Pricing test", "B")
+    create_experiment(db_session, "Pricing test", "C")
+
+    assert [result["id"] for result in test_client.get("/experiments/search?q=pricing&team=A").json()] == [in_a]
+    results = test_client.get("/experiments/search?q=pricing&team=A&include_descendants=true").json()
+    assert sorted(result["id"] for result in results) == [in_a, in_b]
+
+
+def test_search_follows_writes(db_session, test_client):
+    experiment_id = create_experiment(db_session, "Onboarding emails")
+
+    test_client.put(
+        f"/experiments/{experiment_id}/",
+        json={"description": "Welcome flow", "sample_ratio": 0.5, "teams": [{"name": "A"}]},
+    )
+    assert test_client.get("/experiments/search?q=onboarding").json() == []
+    assert len(test_client.get("/experiments/search?q=welcome").json()) == 1
+
+    test_client.delete(f"/experiments/{experiment_id}/")
+    assert test_client.get("/experiments/search?q=welcome").json() == []
@@ -0,0 +1,60 @@
+from sqlalchemy import func, select
+
+from app.models import Experiment, Team, experiment_team_association, team_closure
+from app.seed import _CopyStream, generate_teams, seed
+from app.team_index import get_team_index
+from app.versioning import TEAM_TREE, get_version
+
+
+def test_generate_teams():
+    assert list(generate_teams(1, 7, depth=3, fanout=2)) == [
+        (1, ()), (2, (1,)), (3, (1, 2)), (4, (1, 2)), (5, (1,)), (6, (1, 5)), (7, (1, 5)),
+    ]
+    assert list(generate_teams(1, 3, depth=1, fanout=2)) == [(1, ()), (2, ()), (3, ())]
+
+
+def test_copy_stream():
+    stream = _CopyStream([(1, "A", None), (2, "B", 1)])
+
+    assert stream.read(5) == "1\tA\t\\"
+    assert stream.read() == "N\n2\tB\t1\n"
+    assert stream.read(5) == ""
+
+
+def test_seed(db_session):
+    version = get_version(db_session, TEAM_TREE)
+
+    counts = seed(db_session, teams=40, depth=3, fanout=3, experiments=200, batch_size=50)
+
+    assert db_session.scalar(select(func.count()).select_from(Team)) == counts["team"] == 40
+    assert db_session.scalar(select(func.count()).select_from(Experiment)) == counts["experiment"] == 200
+    assert get_version(db_session, TEAM_TREE) == version + 1
+
+    # Every team has its closure rows, consistent with the parent links
+    team_index = get_team_index(db_session)
+    closure = db_session.execute(
+        select(team_closure.c.ancestor_id, team_closure.c.descendant_id, team_closure.c.depth)
+    ).all()
+    assert len(closure) == counts["team_closure"]
+    for ancestor_id, descendant_id, depth in closure:
+        assert depth == len(team_index.ancestors(descendant_id)) - len(team_index.ancestors(ancestor_id))
+        assert ancestor_id == descendant_id or team_index.is_ancestor(ancestor_id, descendant_id)
+
+    # Experiments have 1 or 2 teams, never an ancestor and its descendant
+    teams_by_experiment = {}
+    for experiment_id, team_id in db_session.execute(select(experiment_team_association)).all():
+        teams_by_experiment.setdefault(experiment_id, []).append(team_id)
+    assert len(teams_by_experiment) == 200
+    for team_ids in teams_by_experiment.values():
+        assert len(team_ids) in (1, 2)
+        if len(team_ids) == 2:
+            assert not team_index.is_ancestor(*team_ids)
+            assert not team_index.is_ancestor(*reversed(team_ids))
+
+
+def test_seed_appends_after_existing_ids(db_session):
+    seed(db_session, teams=5, depth=2, fanout=2, experiments=5)
+    seed(db_session, teams=5, depth=2, fanout=2, experiments=5, prefix="again")
+
+    assert db_session.scalar(select(func.count()).select_from(Team)) == 10
+    assert db_session.scalar(select(func.count()).select_from(Experiment)) == 10
@@ -0,0 +1,110 @@
+import asyncio
+import threading
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import async_crud, crud, schemas
+from app.database import Base
+from app.team_index import TeamTreeIndex, get_team_index, invalidate_team_index
+from app.versioning import TEAM_TREE, bump_version
+
+
+def test_team_tree_index_ancestry():
+    #     1       5
+    #    / \
+    #   2   4
+    #   |
+    #   3
+    index = TeamTreeIndex(0, [(1, "A", None), (2, "B", 1), (3, "C", 2), (4, "D", 1), (5, "E", None)])
+
+    assert index.ids["C"] == 3
+    assert index.is_ancestor(1, 3)
+    assert index.is_ancestor(2, 3)
+    assert not index.is_ancestor(3, 1)
+    assert not index.is_ancestor(4, 3)
+    assert not index.is_ancestor(1, 1)
+    assert not index.is_ancestor(1, 5)
+    assert not index.is_ancestor(1, 42)
+    assert index.ancestors(3) == [2, 1]
+
+
+def test_team_tree_index_deep_chain():
+    rows = [(i, f"Team {i}", i - 1 if i > 1 else None) for i in range(1, 5001)]
+    index = TeamTreeIndex(0, rows)
+
+    assert index.is_ancestor(1, 5000)
+    assert not index.is_ancestor(5000, 1)
+
+
+def test_get_team_index_rebuilds_after_team_writes(db_session):
+    parent = crud.create_team(db_session, team=schemas.TeamCreate(name="Parent"))
+    child = crud.create_team(db_session, team=schemas.TeamCreate(name="Child"))
+    assert not get_team_index(db_session).is_ancestor(parent.id, child.id)
+
+    crud.update_team(db_session, team=schemas.TeamUpdate(name="Child", parent_id=parent.id), team_name="Child")
+    assert get_team_index(db_session).is_ancestor(parent.id, child.id)
+
+
+def test_get_team_index_detects_other_workers_writes(db_session):
+    team = crud.create_team(db_session, team=schemas.TeamCreate(name="Team A"))
+    index = get_team_index(db_session)
+    assert get_team_index(db_session) is index
+
+    # Simulate a write committed by another worker, which only bumps the shared version
+    bump_version(db_session, TEAM_TREE)
+    db_session.commit()
+
+    rebuilt_index = get_team_index(db_session)
+    assert rebuilt_index is not index
+    assert rebuilt_index.ids["Team A"] == team.id
+
+
+def test_create_experiment_with_descendant_teams(db_session, test_client):
+    parent = crud.create_team(db_session, team=schemas.TeamCreate(name="Parent"))
+    crud.create_team(db_session, team=schemas.TeamCreate(name="Child", parent_id=parent.id))
+
+    response = test_client.post(
+        "/experiments/",
+        json={"description": "Experiment", "sample_ratio": 0.5, "teams": [{"name": "Parent"}, {"name": "Child"}]},
+    )
+    assert response.status_code == 400
+
+
+def test_concurrent_async_rebuilds_do_not_deadlock(tmp_path):
+    """
+    Rebuilding the index must not hold a thread lock while querying: under `run_sync`, the query
+    yields to the event loop, whose thread would then block on the lock in the other coroutine.
+    """
+    url = f"sqlite+aiosqlite:///{tmp_path / 'index.db'}"
+    sync_engine = create_engine(url.replace("+aiosqlite", ""))
+    Base.metadata.create_all(bind=sync_engine)
+    with sessionmaker(bind=sync_engine)() as db:
+        crud.create_team(db, team=schemas.TeamCreate(name="A"))
+        crud.create_team(db, team=schemas.TeamCreate(name="B", parent_id=1))
+    sync_engine.dispose()
+
+    async def check_concurrently():
+        engine = create_async_engine(url)
+        AsyncSessionLocal = async_sessionmaker(bind=engine)
+        pairs = [schemas.AncestryCheck(ancestor="A", descendant="B")]
+
+        async def check():
+            async with AsyncSessionLocal() as db:
+                return await async_crud.check_ancestry(db, pairs)
+
+        try:
+            return await asyncio.gather(*(check() for _ in range(4)))
+        finally:
+            await engine.dispose()
+
+    invalidate_team_index()
+    results = []
+    thread = threading.Thread(target=lambda: results.append(asyncio.run(check_concurrently())), daemon=True)
+    thread.start()
+    thread.join(timeout=10)
+    invalidate_team_index()
+
+    assert not thread.is_alive(), "concurrent index rebuilds deadlocked"
+    assert results == [[[True]] * 4]